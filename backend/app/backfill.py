@@ -8,41 +8,36 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from .config import settings
-from .db import CacheDB
-from .moralis import MoralisClient
-from .burn_service import BurnService
+from .registry import ServiceRegistry
 
 
 def parse_date(s: str) -> date:
     return datetime.strptime(s, "%Y-%m-%d").date()
 
-async def run(start: date):
-    db = CacheDB(settings.cache_db_path)
-    moralis = MoralisClient(api_key=settings.moralis_api_key, chain=settings.chain)
-    svc = BurnService(
-        moralis=moralis,
-        db=db,
-        token_address=settings.token_address,
-        dead_address=settings.dead_address,
-        decimals_fallback=settings.token_decimals,
-        cache_ttl_seconds=settings.cache_ttl_seconds,
-        max_supply_tokens=settings.max_supply_tokens,
-        allow_fetch_missing_historical_days=True,  # backfill can always fetch historical data
-        series_cache_ttl_seconds=settings.series_cache_ttl_seconds,
-    )
-
-    today = datetime.now(timezone.utc).date()
-    d = start
-    while d <= (today - timedelta(days=1)):
-        await svc.ensure_day_cached(d, force_refresh=True)
-        print("cached", d.isoformat())
-        d += timedelta(days=1)
+async def run(start: date, chain: str = "", token: str = ""):
+    # backfill can always fetch historical data
+    registry = ServiceRegistry(settings, allow_fetch_missing_historical_days=True)
+    try:
+        svc = registry.get(chain, token) if token else registry.primary
+        if svc is None:
+            raise SystemExit(f"Token não configurado (TOKEN_ADDRESS/TOKENS): {chain}:{token}")
+
+        today = datetime.now(timezone.utc).date()
+        d = start
+        while d <= (today - timedelta(days=1)):
+            await svc.ensure_day_cached(d, force_refresh=True)
+            print("cached", d.isoformat())
+            d += timedelta(days=1)
+    finally:
+        await registry.aclose()
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--start", required=True, help="YYYY-MM-DD")
+    ap.add_argument("--chain", default=settings.chain, help="chain do token (padrão: %(default)s)")
+    ap.add_argument("--token", default="", help="endereço do token (padrão: TOKEN_ADDRESS)")
     args = ap.parse_args()
-    asyncio.run(run(parse_date(args.start)))
+    asyncio.run(run(parse_date(args.start), args.chain, args.token))
 
 if __name__ == "__main__":
     main()
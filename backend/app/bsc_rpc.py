@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+from datetime import datetime
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import httpx
+
+from .resilience import CircuitBreaker, RateLimiter, RetryPolicy, UpstreamUnavailable, send_with_retry
+
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
+# Trechos de mensagem que os provedores usam quando o eth_getLogs excede range/resultados
+_LIMIT_HINTS = ("too large", "range", "more than", "results", "timeout", "timed out")
+# ... e quando a cota de requisições estoura. -32005 e "limit exceeded" aparecem nos
+# dois casos conforme o provedor: rate limit é checado primeiro e nunca divide o trecho.
+_RATE_LIMIT_HINTS = (
+    "rate limit", "rate exceeded", "too many requests", "request limit", "request count",
+    "requests per", "quota", "credits", "capacity", "limit exceeded",
+)
+_RATE_LIMIT_CODES = (429, -32029, -32090)
+
+logger = logging.getLogger(__name__)
+
+class RpcError(RuntimeError):
+    def __init__(self, code: int, message: str):
+        super().__init__(f"JSON-RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+
+    @property
+    def is_rate_limit(self) -> bool:
+        msg = self.message.lower()
+        return self.code in _RATE_LIMIT_CODES or any(h in msg for h in _RATE_LIMIT_HINTS)
+
+    @property
+    def is_limit(self) -> bool:
+        """Range/resultados demais para um eth_getLogs (dividir o trecho resolve)."""
+        if self.is_rate_limit:
+            return False
+        msg = self.message.lower()
+        return self.code == -32005 or any(h in msg for h in _LIMIT_HINTS)
+
+class _ChunkSize:
+    """
+    Tamanho dos trechos de eth_getLogs de uma chamada: cai para metade do range
+    recusado e volta a dobrar (até `maximum`) após `grow_after` sucessos seguidos.
+    """
+    def __init__(self, maximum: int, grow_after: int = 4):
+        self.maximum = maximum
+        self.value = maximum
+        self.grow_after = grow_after
+        self._ok = 0
+
+    def shrink(self, span: int) -> None:
+        self.value = max(1, min(self.value, span // 2))
+        self._ok = 0
+
+    def success(self) -> None:
+        self._ok += 1
+        if self._ok >= self.grow_after and self.value < self.maximum:
+            self.value = min(self.maximum, self.value * 2)
+            self._ok = 0
+
+def _topic_address(address: str) -> str:
+    return "0x" + address.lower().replace("0x", "").rjust(64, "0")
+
+def _iso_to_epoch(s: str) -> int:
+    return int(datetime.fromisoformat(s.replace("Z", "+00:00")).timestamp())
+
+class BscRpcClient:
+    """
+    Fonte de transfers alternativa ao Moralis: lê logs ERC-20 `Transfer` para a
+    dead wallet direto de um nó JSON-RPC (eth_getLogs), sem consumir créditos.
+
+    - Intervalo de datas -> blocos: busca (interpolação + bisseção) do primeiro
+      bloco com timestamp >= limite; resultados ficam em memória.
+    - eth_getLogs em trechos de `chunk_blocks`, com `concurrency` trechos em paralelo.
+      Se o provedor recusar por limite de range/resultados, o trecho é dividido ao
+      meio e os próximos trechos da mesma chamada saem menores (voltando a crescer
+      após sucessos). Rate limit do provedor não divide: espera com backoff.
+    - `transport` permite apontar para um stand-in local (ex.: httpx.MockTransport);
+      `http` reaproveita um pool HTTP compartilhado.
+
+    Mesma interface de MoralisClient.iter_burn_transfers (itens com `value`).
+    """
+    source_name = "bsc-rpc"
+
+    def __init__(
+        self,
+        rpc_url: str,
+        timeout: float = 30.0,
+        chunk_blocks: int = 5000,
+        concurrency: int = 4,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        http: Optional[httpx.AsyncClient] = None,
+    ):
+        if not rpc_url:
+            raise RuntimeError("BSC_RPC_URL não definido.")
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+        self.chunk_blocks = max(1, chunk_blocks)
+        self.concurrency = max(1, concurrency)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker("bsc_rpc")
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.http = http
+        self._block_ts: Dict[int, int] = {}
+        self._boundary_blocks: Dict[int, int] = {}
+        self._req_id = 0
+
+    @asynccontextmanager
+    async def _client(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self.http is not None and self.transport is None:
+            yield self.http
+            return
+        async with httpx.AsyncClient(timeout=self.timeout, transport=self.transport) as client:
+            yield client
+
+    async def _call_once(self, client: httpx.AsyncClient, method: str, params: List[Any]) -> Any:
+        self._req_id += 1
+        body = {"jsonrpc": "2.0", "id": self._req_id, "method": method, "params": params}
+        r = await send_with_retry(
+            lambda: client.post(self.rpc_url, json=body, timeout=self.timeout),
+            self.retry_policy,
+            self.breaker,
+            self.rate_limiter,
+        )
+        payload = r.json()
+        if payload.get("error"):
+            err = payload["error"]
+            raise RpcError(int(err.get("code", 0)), str(err.get("message", "")))
+        return payload.get("result")
+
+    async def _call(self, client: httpx.AsyncClient, method: str, params: List[Any]) -> Any:
+        """_call_once, esperando com backoff quando o provedor responde rate limit dentro do JSON-RPC (HTTP 200)."""
+        policy = self.retry_policy
+        attempts = max(1, policy.max_attempts)
+        for attempt in range(1, attempts + 1):
+            try:
+                return await self._call_once(client, method, params)
+            except RpcError as e:
+                if not e.is_rate_limit:
+                    raise
+                if attempt == attempts:
+                    raise UpstreamUnavailable(f"RPC rate limited after retries ({e.message})") from e
+                logger.info("RPC rate limited on %s (%s); backing off", method, e.message)
+                await asyncio.sleep(min(policy.backoff(attempt), policy.max_delay))
+
+    async def _latest_block(self, client: httpx.AsyncClient) -> Tuple[int, int]:
+        block = await self._call(client, "eth_getBlockByNumber", ["latest", False])
+        n = int(block["number"], 16)
+        self._block_ts[n] = int(block["timestamp"], 16)
+        return n, self._block_ts[n]
+
+    async def _timestamp(self, client: httpx.AsyncClient, n: int) -> int:
+        if n not in self._block_ts:
+            block = await self._call(client, "eth_getBlockByNumber", [hex(n), False])
+            self._block_ts[n] = int(block["timestamp"], 16)
+        return self._block_ts[n]
+
+    async def _first_block_at_or_after(self, client: httpx.AsyncClient, ts: int, latest: int, latest_ts: int) -> int:
+        """Primeiro bloco com timestamp >= ts (latest + 1 se ts estiver no futuro)."""
+        if ts > latest_ts:
+            return latest + 1
+        if ts in self._boundary_blocks:
+            return self._boundary_blocks[ts]
+
+        lo, hi = 0, latest
+        lo_ts, hi_ts = await self._timestamp(client, lo), latest_ts
+        if ts <= lo_ts:
+            return 0
+        # aproveita timestamps já conhecidos (dias vizinhos num backfill) para estreitar o intervalo
+        for n, n_ts in self._block_ts.items():
+            if n_ts < ts and n > lo:
+                lo, lo_ts = n, n_ts
+            elif n_ts >= ts and n < hi:
+                hi, hi_ts = n, n_ts
+        # invariante: ts(lo) < ts <= ts(hi)
+        step = 0
+        while hi - lo > 1:
+            if step % 2 == 0:
+                # interpolação pelo tempo médio de bloco (converge rápido com blocos regulares)
+                guess = lo + int((ts - lo_ts) * (hi - lo) / max(1, hi_ts - lo_ts))
+            else:
+                # bisseção alternada garante convergência mesmo com tempo de bloco irregular
+                guess = (lo + hi) // 2
+            guess = min(max(guess, lo + 1), hi - 1)
+            step += 1
+            g_ts = await self._timestamp(client, guess)
+            if g_ts >= ts:
+                hi, hi_ts = guess, g_ts
+            else:
+                lo, lo_ts = guess, g_ts
+
+        self._boundary_blocks[ts] = hi
+        return hi
+
+    async def _get_logs(
+        self, client: httpx.AsyncClient, flt: Dict[str, Any], lo: int, hi: int, chunk: _ChunkSize
+    ) -> List[Dict[str, Any]]:
+        try:
+            logs = await self._call(client, "eth_getLogs", [{**flt, "fromBlock": hex(lo), "toBlock": hex(hi)}]) or []
+        except RpcError as e:
+            if not e.is_limit or lo == hi:
+                raise
+            mid = (lo + hi) // 2
+            # próximos trechos desta chamada já saem menores
+            chunk.shrink(hi - lo + 1)
+            logger.info("eth_getLogs limit on %d-%d (%s); splitting, chunk=%d", lo, hi, e.message, chunk.value)
+            left = await self._get_logs(client, flt, lo, mid, chunk)
+            right = await self._get_logs(client, flt, mid + 1, hi, chunk)
+            return left + right
+        chunk.success()
+        return logs
+
+    async def iter_burn_transfers(
+        self,
+        token_address: str,
+        to_address: str | None = None,
+        dead_address: str | None = None,
+        from_date_iso: str = "",
+        to_date_iso: str = "",
+        **_: Any,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        target_address = (to_address or dead_address)
+        if not target_address:
+            raise ValueError("to_address/dead_address é obrigatório.")
+
+        flt = {
+            "address": token_address,
+            "topics": [TRANSFER_TOPIC, None, _topic_address(target_address)],
+        }
+        logs: List[Dict[str, Any]] = []
+
+        async with self._client() as client:
+            latest, latest_ts = await self._latest_block(client)
+            # [from, to): to_date é o início do dia seguinte
+            from_block = await self._first_block_at_or_after(client, _iso_to_epoch(from_date_iso), latest, latest_ts)
+            to_block = await self._first_block_at_or_after(client, _iso_to_epoch(to_date_iso), latest, latest_ts) - 1
+
+            next_block = from_block
+            chunk = _ChunkSize(self.chunk_blocks)
+
+            async def worker() -> None:
+                nonlocal next_block
+                while next_block <= to_block:
+                    lo = next_block
+                    hi = min(to_block, lo + chunk.value - 1)
+                    next_block = hi + 1
+                    logs.extend(await self._get_logs(client, flt, lo, hi, chunk))
+
+            if from_block <= to_block:
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        seen: Set[Tuple[str, int]] = set()
+        dead_lc = target_address.lower()
+        for log in sorted(logs, key=lambda l: (int(l["blockNumber"], 16), int(l["logIndex"], 16))):
+            if log.get("removed"):
+                continue
+            tid = (log["transactionHash"], int(log["logIndex"], 16))
+            if tid in seen:
+                continue
+            seen.add(tid)
+            yield {
+                "transaction_hash": log["transactionHash"],
+                "log_index": tid[1],
+                "block_number": int(log["blockNumber"], 16),
+                "to_address": dead_lc,
+                "value": str(int(log.get("data") or "0x0", 16)),
+            }
@@ -1,30 +1,60 @@
 from __future__ import annotations
 
+from collections import Counter
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import date, timedelta
 from decimal import Decimal
-from typing import Dict, List, Optional, Tuple
+from fractions import Fraction
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
 import time
 import math
 import json
 
-from .db import CacheDB
-from .moralis import MoralisClient, TokenMeta
+from .db import CacheDB, KVRow
+from .moralis import BurnScanTruncated, MoralisClient, TokenMeta
+from .resilience import UpstreamUnavailable
 from .utils import (
     utc_today,
     day_start_end_iso,
-    raw_to_tokens,
-    tokens_to_T,
+    tokens_to_raw,
     fmt_decimal,
-    pct,
+    fmt_raw,
+    fmt_ratio,
+    fmt_fraction,
+    pct_raw,
+    period_start,
+    period_end,
 )
 
+# tokens -> "T" (trilhões de tokens)
+T_DIGITS = 12
+
+logger = logging.getLogger(__name__)
+
+# True dentro do pré-aquecimento da virada do dia: não conta como demanda de usuário
+_PREWARMING: ContextVar[bool] = ContextVar("prewarming", default=False)
+
+# Chaves distintas de demanda guardadas por dia (as chaves vêm da query string do cliente)
+DEMAND_MAX_KEYS = 1000
+
 @dataclass
 class DailyBurn:
     day: str
     burn_raw: str
     burn: str
 
+@dataclass
+class PeriodBurn:
+    period: str      # início do período (semana ISO / mês)
+    start_day: str   # recortado à janela pedida
+    end_day: str
+    days: int
+    burn_raw: str
+    burn: str
+
 class MissingHistoricalCache(Exception):
     def __init__(self, missing_days: List[str]):
         super().__init__("Missing historical cache days: " + ", ".join(missing_days))
@@ -42,24 +72,84 @@ class BurnService:
         max_supply_tokens: str,
         allow_fetch_missing_historical_days: bool = False,
         series_cache_ttl_seconds: int = 300,
+        transfer_source: Optional[Any] = None,
+        balance_cache_ttl_seconds: Optional[int] = None,
+        price_cache_ttl_seconds: Optional[int] = None,
+        chain: str = "bsc",
+        track_demand: bool = True,
     ):
         self.moralis = moralis
+        self.chain = chain
+        # De onde vêm os transfers diários: Moralis (padrão) ou BscRpcClient (eth_getLogs).
+        # Metadata, preço e balance continuam vindo do Moralis.
+        self.transfer_source = transfer_source or moralis
+        self.data_source = f"{self.transfer_source.source_name}+sqlite-cache"
         self.db = db
         self.token_address = token_address
         self.dead_address = dead_address
         self.decimals_fallback = decimals_fallback
         self.cache_ttl_seconds = cache_ttl_seconds
         self.series_cache_ttl_seconds = series_cache_ttl_seconds
+        self.balance_cache_ttl_seconds = cache_ttl_seconds if balance_cache_ttl_seconds is None else balance_cache_ttl_seconds
+        self.price_cache_ttl_seconds = cache_ttl_seconds if price_cache_ttl_seconds is None else price_cache_ttl_seconds
         self.allow_fetch_missing_historical_days = allow_fetch_missing_historical_days
         self._meta: Optional[TokenMeta] = None
         self.max_supply_tokens_str = max_supply_tokens
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Chaves de série/projeção pedidas por dia UTC (pré-aquecidas na virada do dia).
+        # Só contadas com o rollover ligado; no máximo DEMAND_MAX_KEYS chaves por dia.
+        self.track_demand = track_demand
+        self._demand: Dict[str, Counter] = {}
+
+    def _record_demand(self, *key: Any) -> None:
+        if not self.track_demand or _PREWARMING.get():
+            return
+        today = utc_today()
+        counter = self._demand.get(today.isoformat())
+        if counter is None:
+            # só hoje e ontem interessam ao rollover, mesmo que ele não tenha rodado
+            y = (today - timedelta(days=1)).isoformat()
+            self._demand = {d: c for d, c in self._demand.items() if d >= y}
+            counter = self._demand[today.isoformat()] = Counter()
+        if key in counter or len(counter) < DEMAND_MAX_KEYS:
+            counter[key] += 1
+
+    def _fresh_kv(self, key: str, now: int) -> Optional[KVRow]:
+        """Entrada de série/projeção ainda dentro do TTL. No prewarm da virada do dia sempre recalcula."""
+        if _PREWARMING.get():
+            return None
+        kv = self.db.get_kv(key)
+        if kv and (now - kv.updated_at) <= self.series_cache_ttl_seconds:
+            return kv
+        return None
+
+    async def _shared(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Single-flight: chamadas concorrentes com a mesma chave aguardam a mesma execução."""
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(factory())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _f: self._inflight.pop(key, None))
+        return await asyncio.shield(fut)
 
     async def get_meta(self) -> TokenMeta:
         if self._meta:
             return self._meta
-        meta = await self.moralis.get_token_metadata(self.token_address)
+        return await self._shared("meta", self._load_meta)
+
+    async def _load_meta(self) -> TokenMeta:
+        try:
+            meta = await self.moralis.get_token_metadata(self.token_address)
+        except UpstreamUnavailable:
+            # Moralis fora: usa a última metadata persistida (sem memoizar, tenta de novo depois)
+            kv = self.db.get_kv("token_meta")
+            if kv:
+                return TokenMeta(**json.loads(kv.payload_json))
+            return TokenMeta(name="", symbol="", decimals=self.decimals_fallback)
         if not meta:
             meta = TokenMeta(name="", symbol="", decimals=self.decimals_fallback)
+        else:
+            self.db.upsert_kv("token_meta", meta.__dict__, int(time.time()))
         self._meta = meta
         return meta
 
@@ -67,7 +157,7 @@ class BurnService:
         # Sum transfers to dead during that UTC day
         start_iso, end_iso = day_start_end_iso(day)
         total = 0
-        async for t in self.moralis.iter_burn_transfers(
+        async for t in self.transfer_source.iter_burn_transfers(
             token_address=self.token_address,
             to_address=self.dead_address,
             from_date_iso=start_iso,
@@ -79,6 +169,14 @@ class BurnService:
             total += int(v)
         return total
 
+    async def _refresh_day(self, day: date) -> int:
+        return await self._shared(f"day:{day.isoformat()}", lambda: self._fetch_and_store_day(day))
+
+    async def _fetch_and_store_day(self, day: date) -> int:
+        burn_raw = await self._fetch_burn_raw_for_day(day)
+        self.db.upsert_daily(day.isoformat(), str(burn_raw), int(time.time()))
+        return burn_raw
+
     async def ensure_day_cached(self, day: date, force_refresh: bool = False) -> int:
         day_s = day.isoformat()
         row = self.db.get_daily(day_s)
@@ -93,19 +191,21 @@ class BurnService:
         if row is None:
             if (not is_today) and (not force_refresh) and (not self.allow_fetch_missing_historical_days):
                 raise MissingHistoricalCache([day_s])
-            burn_raw = await self._fetch_burn_raw_for_day(day)
-            self.db.upsert_daily(day_s, str(burn_raw), now)
-            return burn_raw
+            return await self._refresh_day(day)
 
         if is_today and ((now - row.updated_at) > self.cache_ttl_seconds or force_refresh):
-            burn_raw = await self._fetch_burn_raw_for_day(day)
-            self.db.upsert_daily(day_s, str(burn_raw), now)
-            return burn_raw
+            try:
+                return await self._refresh_day(day)
+            except (UpstreamUnavailable, BurnScanTruncated) as e:
+                if force_refresh:
+                    raise
+                # Moralis indisponível ou varredura truncada: serve o valor em cache
+                # (updated_at continua antigo, o próximo refresh tenta de novo)
+                logger.warning("Today refresh failed for %s, serving cached row: %s", self.token_address, e)
+                return int(row.burn_raw)
 
         if force_refresh:
-            burn_raw = await self._fetch_burn_raw_for_day(day)
-            self.db.upsert_daily(day_s, str(burn_raw), now)
-            return burn_raw
+            return await self._refresh_day(day)
 
         return int(row.burn_raw)
 
@@ -113,6 +213,7 @@ class BurnService:
         return f"series:{window_days}:{today_iso}"
 
     async def get_daily_series(self, window_days: int) -> Tuple[List[DailyBurn], int, str, str, int]:
+        self._record_demand("series", window_days, "day")
         meta = await self.get_meta()
         today = utc_today()
 
@@ -121,8 +222,8 @@ class BurnService:
 
         cache_key = self._series_cache_key(window_days, today.isoformat())
         now = int(time.time())
-        kv = self.db.get_kv(cache_key)
-        if kv and (now - kv.updated_at) <= self.series_cache_ttl_seconds:
+        kv = self._fresh_kv(cache_key, now)
+        if kv:
             payload = json.loads(kv.payload_json)
             daily = [DailyBurn(**d) for d in payload["daily"]]
             return daily, int(payload["total_raw"]), payload["start_day"], payload["end_day"], int(payload["today_updated_epoch"])
@@ -149,12 +250,11 @@ class BurnService:
                 row = self.db.get_daily(day.isoformat())
                 today_updated_epoch = int(row.updated_at) if row else 0
 
-            burn_tokens = raw_to_tokens(burn_raw, meta.decimals)
             daily.append(
                 DailyBurn(
                     day=day.isoformat(),
                     burn_raw=str(burn_raw),
-                    burn=fmt_decimal(burn_tokens, 18),
+                    burn=fmt_raw(burn_raw, meta.decimals),
                 )
             )
             total_raw += burn_raw
@@ -174,6 +274,262 @@ class BurnService:
 
         return daily, total_raw, start_day.isoformat(), today.isoformat(), today_updated_epoch
 
+    async def _period_totals(self, start_day: date, end_day: date, granularity: str) -> List[Tuple[date, date, date, int]]:
+        """
+        Soma de burn por período em [start_day, end_day]: (período, início, fim, burn_raw).
+        Períodos inteiros vêm de `token_burn_rollup`; só as bordas parciais e períodos
+        incompletos leem linhas diárias. Dias ausentes seguem a regra de ensure_day_cached.
+        """
+        first_period = period_start(start_day, granularity)
+        rollups = {
+            r.period: r
+            for r in self.db.list_rollup_range(granularity, first_period.isoformat(), end_day.isoformat())
+        }
+
+        out: List[Tuple[date, date, date, int]] = []
+        missing: List[str] = []
+
+        p = first_period
+        while p <= end_day:
+            p_end = period_end(p, granularity)
+            lo = max(p, start_day)
+            hi = min(p_end, end_day)
+            expected_days = (hi - lo).days + 1
+
+            rollup = rollups.get(p.isoformat())
+            # período cobre até `hi`: no mês/semana corrente não existem linhas futuras
+            if lo == p and (hi == p_end or hi == utc_today()) and rollup and rollup.days == expected_days:
+                burn_raw = int(rollup.burn_raw)
+            else:
+                rows = {r.day: int(r.burn_raw) for r in self.db.list_daily_range(lo.isoformat(), hi.isoformat())}
+                burn_raw = sum(rows.values())
+                d = lo
+                while d <= hi:
+                    if d.isoformat() not in rows:
+                        try:
+                            burn_raw += await self.ensure_day_cached(d)
+                        except MissingHistoricalCache as e:
+                            missing.extend(e.missing_days)
+                    d += timedelta(days=1)
+
+            out.append((p, lo, hi, burn_raw))
+            p = p_end + timedelta(days=1)
+
+        if missing:
+            raise MissingHistoricalCache(sorted(set(missing)))
+        return out
+
+    async def get_period_series(self, window_days: int, granularity: str) -> Tuple[List[PeriodBurn], int, str, str, int]:
+        """
+        Mesma janela de get_daily_series, agregada por semana/mês.
+        Períodos inteiros dentro da janela vêm de `token_burn_rollup`; só os períodos
+        das bordas (parciais) e períodos incompletos leem linhas diárias.
+        """
+        self._record_demand("series", window_days, granularity)
+        meta = await self.get_meta()
+        today = utc_today()
+        start_day = today - timedelta(days=window_days - 1)
+
+        cache_key = self._series_cache_key(window_days, today.isoformat()) + f":{granularity}"
+        now = int(time.time())
+        kv = self._fresh_kv(cache_key, now)
+        if kv:
+            payload = json.loads(kv.payload_json)
+            points = [PeriodBurn(**p) for p in payload["points"]]
+            return points, int(payload["total_raw"]), payload["start_day"], payload["end_day"], int(payload["today_updated_epoch"])
+
+        # Atualiza a linha de hoje antes de ler os rollups (upsert_daily mantém os rollups)
+        await self.ensure_day_cached(today)
+        t_row = self.db.get_daily(today.isoformat())
+        today_updated_epoch = int(t_row.updated_at) if t_row else 0
+
+        points: List[PeriodBurn] = []
+        total_raw = 0
+        for p, lo, hi, burn_raw in await self._period_totals(start_day, today, granularity):
+            points.append(
+                PeriodBurn(
+                    period=p.isoformat(),
+                    start_day=lo.isoformat(),
+                    end_day=hi.isoformat(),
+                    days=(hi - lo).days + 1,
+                    burn_raw=str(burn_raw),
+                    burn=fmt_raw(burn_raw, meta.decimals),
+                )
+            )
+            total_raw += burn_raw
+
+        payload = {
+            "points": [pt.__dict__ for pt in points],
+            "total_raw": str(total_raw),
+            "start_day": start_day.isoformat(),
+            "end_day": today.isoformat(),
+            "today_updated_epoch": today_updated_epoch,
+        }
+        self.db.upsert_kv(cache_key, payload, now)
+
+        return points, total_raw, start_day.isoformat(), today.isoformat(), today_updated_epoch
+
+    def _slice_series(
+        self, series: Tuple[List[DailyBurn], int, str, str, int], window_days: int
+    ) -> Tuple[List[DailyBurn], int, str, str, int]:
+        # Últimos `window_days` de uma série maior (sem buracos: get_daily_series falha se faltar dia)
+        daily, total_raw, start_day, end_day, today_updated_epoch = series
+        if len(daily) <= window_days:
+            return series
+        part = daily[-window_days:]
+        return part, sum(int(d.burn_raw) for d in part), part[0].day, end_day, today_updated_epoch
+
+    async def series(
+        self,
+        window_days: int,
+        granularity: str = "day",
+        daily_series: Optional[Tuple[List[DailyBurn], int, str, str, int]] = None,
+    ) -> Dict:
+        if granularity == "day":
+            daily, total_raw, start_day, end_day, today_updated_epoch = daily_series or await self.get_daily_series(window_days)
+            points = {"daily": [d.__dict__ for d in daily]}
+        else:
+            periods, total_raw, start_day, end_day, today_updated_epoch = await self.get_period_series(window_days, granularity)
+            points = {"points": [p.__dict__ for p in periods]}
+        meta = await self.get_meta()
+
+        return {
+            "token": {
+                "address": self.token_address,
+                "name": meta.name,
+                "symbol": meta.symbol,
+                "decimals": meta.decimals,
+                "dead_address": self.dead_address,
+            },
+            "window_days": window_days,
+            "granularity": granularity,
+            "start_day": start_day,
+            "end_day": end_day,
+            "total_burn_raw": str(int(total_raw)),
+            "total_burn": fmt_raw(int(total_raw), meta.decimals),
+            **points,
+            "data_source": self.data_source,
+            "today_last_updated_epoch": today_updated_epoch,
+        }
+
+    async def dashboard(
+        self,
+        window_days: int,
+        horizon_days: int,
+        model: str,
+        chart_window_days: int,
+        granularity: str = "day",
+        include_projection: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Os quatro payloads da página (/token/metrics, /burn/summary, /burn/projection,
+        /burn/series) numa chamada. Série diária e tokenomics são calculadas uma vez
+        e compartilhadas; a linha de hoje é buscada uma vez (single-flight).
+        Seções que falharem voltam como a exceção correspondente.
+        `include_projection=False` omite a projeção (e a série da janela dela).
+        """
+        # a série diária maior entre as janelas pedidas; as outras são fatias dela
+        windows = ([window_days] if include_projection else []) + ([chart_window_days] if granularity == "day" else [])
+        shared_window = max(windows, default=0)
+        jobs = [self.token_metrics(), self.summary()]
+        if granularity != "day":
+            jobs.append(self.series(chart_window_days, granularity))
+        if shared_window:
+            jobs.append(self.get_daily_series(shared_window))
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        tokenomics, summary = results[0], results[1]
+        shared_series = results[-1] if shared_window else None
+
+        async def series_for(w: int) -> Tuple[List[DailyBurn], int, str, str, int]:
+            if not isinstance(shared_series, BaseException):
+                return self._slice_series(shared_series, w)
+            # dias faltando só na janela maior não devem derrubar a janela menor
+            if isinstance(shared_series, MissingHistoricalCache) and w < shared_window:
+                return await self.get_daily_series(w)
+            raise shared_series
+
+        out: Dict[str, Any] = {"token_metrics": tokenomics, "summary": summary}
+
+        if granularity != "day":
+            out["series"] = results[2]
+        else:
+            try:
+                out["series"] = await self.series(chart_window_days, daily_series=await series_for(chart_window_days))
+            except Exception as e:
+                out["series"] = e
+
+        if not include_projection:
+            return out
+        try:
+            if isinstance(tokenomics, BaseException):
+                raise tokenomics
+            out["projection"] = await self.projection(
+                window_days,
+                horizon_days,
+                model,
+                daily_series=await series_for(window_days),
+                tokenomics=tokenomics,
+            )
+        except Exception as e:
+            out["projection"] = e
+        return out
+
+    async def rollover(self, prewarm_keys: int = 10) -> Dict[str, Any]:
+        """
+        Virada do dia UTC (job agendado logo após 00:00):
+        1. última varredura de ontem (a linha ficou com o valor do último refresh de "hoje");
+        2. cria a linha do novo dia;
+        3. recalcula as `prewarm_keys` chaves de série/projeção mais pedidas ontem,
+           para a primeira requisição do dia já encontrar o cache quente;
+        4. remove do KV as chaves de série/projeção de ontem (não serão mais lidas).
+        As chaves de hoje gravadas antes do passo 1 (entre 00:00 e o job) têm o valor
+        parcial de ontem: são removidas logo após o passo 1, e o passo 3 ignora o KV.
+        Cada passo falha isoladamente (logado); o resto continua.
+        """
+        today = utc_today()
+        yesterday = today - timedelta(days=1)
+        token = _PREWARMING.set(True)
+        out: Dict[str, Any] = {"day": today.isoformat(), "warmed": [], "failed": []}
+        try:
+            for label, day in (("yesterday", yesterday), ("today", today)):
+                try:
+                    out[f"{label}_burn_raw"] = str(await self.ensure_day_cached(day, force_refresh=True))
+                except Exception as e:
+                    logger.warning("Rollover: refresh of %s failed for %s: %s", day, self.token_address, e)
+                    out["failed"].append({"key": f"day:{day.isoformat()}", "error": str(e)})
+
+            out["invalidated"] = self._evict_day_keys(today.isoformat())
+
+            popular = self._demand.get(yesterday.isoformat(), Counter()).most_common(max(0, prewarm_keys))
+            for key, _count in popular:
+                try:
+                    if key[0] == "series":
+                        _kind, window_days, granularity = key
+                        if granularity == "day":
+                            await self.get_daily_series(window_days)
+                        else:
+                            await self.get_period_series(window_days, granularity)
+                    else:
+                        _kind, window_days, horizon_days, model = key
+                        await self.projection(window_days, horizon_days, model)
+                    out["warmed"].append(":".join(str(k) for k in key))
+                except Exception as e:
+                    logger.warning("Rollover: prewarm of %s failed for %s: %s", key, self.token_address, e)
+                    out["failed"].append({"key": ":".join(str(k) for k in key), "error": str(e)})
+        finally:
+            _PREWARMING.reset(token)
+
+        y = yesterday.isoformat()
+        out["evicted"] = self._evict_day_keys(y)
+        self._demand = {d: c for d, c in self._demand.items() if d >= y}
+        return out
+
+    def _evict_day_keys(self, day_iso: str) -> int:
+        return sum(
+            self.db.delete_kv_like(pattern)
+            for pattern in (f"series:%:{day_iso}", f"series:%:{day_iso}:%", f"projection:%:{day_iso}")
+        )
+
     async def summary(self) -> Dict:
         meta = await self.get_meta()
         today = utc_today()
@@ -196,101 +552,103 @@ class BurnService:
             "yesterday": {
                 "day": yesterday.isoformat(),
                 "burn_raw": str(y_raw),
-                "burn": fmt_decimal(raw_to_tokens(y_raw, meta.decimals)),
+                "burn": fmt_raw(y_raw, meta.decimals),
                 "label": "Yesterday X tokens were burned",
             },
             "today": {
                 "day": today.isoformat(),
                 "burn_raw": str(t_raw),
-                "burn": fmt_decimal(raw_to_tokens(t_raw, meta.decimals)),
+                "burn": fmt_raw(t_raw, meta.decimals),
                 "label": "Today X tokens have been burned (Updated every 5 minutes)",
                 "last_updated_epoch": t_updated,
             },
-            "data_source": "moralis+sqlite-cache",
+            "data_source": self.data_source,
         }
 
-    def _linear_regression_slope(self, xs: List[float], ys: List[float]) -> float:
-        n = len(xs)
+    def _regression_slope(self, ys: List[int]) -> Fraction:
+        """Slope exato (mínimos quadrados) de ys contra x = 0..n-1, só com inteiros."""
+        n = len(ys)
         if n < 2:
-            return 0.0
-        x_mean = sum(xs) / n
-        y_mean = sum(ys) / n
-        num = sum((xs[i] - x_mean) * (ys[i] - y_mean) for i in range(n))
-        den = sum((xs[i] - x_mean) ** 2 for i in range(n))
-        if den == 0:
-            return 0.0
-        return num / den
+            return Fraction(0)
+        sx = n * (n - 1) // 2
+        sxx = (n - 1) * n * (2 * n - 1) // 6
+        sy = sum(ys)
+        sxy = sum(i * y for i, y in enumerate(ys))
+        return Fraction(n * sxy - sx * sy, n * sxx - sx * sx)
+
+    def _burn_rate(self, daily: List[DailyBurn], model: str) -> Tuple[Fraction, str, str]:
+        """Taxa X (raw/dia, exata) do modelo sobre a janela: (x, modelo efetivo, premissa)."""
+        burns_raw = [int(d.burn_raw) for d in daily]
+        mean = Fraction(sum(burns_raw), len(burns_raw))
+
+        if model == "mean":
+            return mean, model, "Daily average burn over the last W days."
+
+        cum = []
+        running = 0
+        for b in burns_raw:
+            running += b
+            cum.append(running)
+        slope = self._regression_slope(cum)  # raw/day
+        if slope < 0:
+            return mean, "regression_fallback_mean", "Unstable/negative regression; fallback to mean."
+        return slope, model, "Linear regression on cumulative burn (slope = tokens/day)."
+
+    def _max_supply_raw(self, decimals: int) -> int:
+        return tokens_to_raw(Decimal(self.max_supply_tokens_str or "0"), decimals)
 
     def _projection_cache_key(self, window_days: int, horizon_days: int, model: str, today_iso: str) -> str:
         return f"projection:{model}:{window_days}:{horizon_days}:{today_iso}"
 
-    async def projection(self, window_days: int, horizon_days: int, model: str) -> Dict:
+    async def projection(
+        self,
+        window_days: int,
+        horizon_days: int,
+        model: str,
+        daily_series: Optional[Tuple[List[DailyBurn], int, str, str, int]] = None,
+        tokenomics: Optional[Dict] = None,
+    ) -> Dict:
+        # daily_series/tokenomics: resultados já calculados (ex.: /dashboard) para não refazer o trabalho
+        self._record_demand("projection", window_days, horizon_days, model)
         today_iso = utc_today().isoformat()
         now = int(time.time())
         cache_key = self._projection_cache_key(window_days, horizon_days, model, today_iso)
-        kv = self.db.get_kv(cache_key)
-        if kv and (now - kv.updated_at) <= self.series_cache_ttl_seconds:
+        kv = self._fresh_kv(cache_key, now)
+        if kv:
             payload = json.loads(kv.payload_json)
             payload["cached"] = True
             return payload
 
         meta = await self.get_meta()
-        daily, total_raw, start_day, end_day, today_updated_epoch = await self.get_daily_series(window_days)
-        burns_tokens = [Decimal(d.burn) for d in daily]  # tokens per day
-
-        assumption = ""
-        used_model = model
-
-        if model == "mean":
-            x = sum(burns_tokens) / Decimal(len(burns_tokens))
-            y = x * Decimal(horizon_days)
-            assumption = "Daily average burn over the last W days."
-        else:
-            cum = []
-            running = Decimal(0)
-            for b in burns_tokens:
-                running += b
-                cum.append(running)
-            xs = [float(i) for i in range(len(cum))]
-            ys = [float(c) for c in cum]
-            slope = self._linear_regression_slope(xs, ys)  # tokens/day
-            if not math.isfinite(slope) or slope < 0:
-                used_model = "regression_fallback_mean"
-                x = sum(burns_tokens) / Decimal(len(burns_tokens))
-                y = x * Decimal(horizon_days)
-                assumption = "Unstable/negative regression; fallback to mean."
-            else:
-                x = Decimal(str(slope))
-                y = x * Decimal(horizon_days)
-                assumption = "Linear regression on cumulative burn (slope = tokens/day)."
-
-        tokenomics = await self.token_metrics()
-        max_supply = Decimal(tokenomics["max_supply_tokens"])
-        burned_now = Decimal(tokenomics["burned_tokens"])
-        burned_future = burned_now + y
-        if burned_future > max_supply:
-            burned_future = max_supply
+        daily, total_raw, start_day, end_day, today_updated_epoch = daily_series or await self.get_daily_series(window_days)
+        x, used_model, assumption = self._burn_rate(daily, model)
+        y = x * horizon_days
+
+        if tokenomics is None:
+            tokenomics = await self.token_metrics()
+        dec = meta.decimals
+        max_supply = self._max_supply_raw(dec)
+        burned_future = min(int(tokenomics["burned_raw"]) + y, Fraction(max_supply))
         remaining_future = max_supply - burned_future
-        burned_pct_future = pct(burned_future, max_supply)
 
         tokenomics_projected = {
-            "burned_tokens": fmt_decimal(burned_future),
-            "burned_t": fmt_decimal(tokens_to_T(burned_future)),
-            "burned_pct": fmt_decimal(burned_pct_future),
-            "remaining_tokens": fmt_decimal(remaining_future),
-            "remaining_t": fmt_decimal(tokens_to_T(remaining_future)),
+            "burned_tokens": fmt_fraction(burned_future, dec),
+            "burned_t": fmt_fraction(burned_future, dec + T_DIGITS),
+            "burned_pct": fmt_fraction(burned_future * 100 / max_supply),
+            "remaining_tokens": fmt_fraction(remaining_future, dec),
+            "remaining_t": fmt_fraction(remaining_future, dec + T_DIGITS),
         }
 
         payload = {
             "model": used_model,
             "window_days": window_days,
             "horizon_days": horizon_days,
-            "x_burn_per_day_raw": str(int((x * (Decimal(10) ** Decimal(meta.decimals))).to_integral_value())),
-            "x_burn_per_day": fmt_decimal(x),
-            "y_burn_raw": str(int((y * (Decimal(10) ** Decimal(meta.decimals))).to_integral_value())),
-            "y_burn": fmt_decimal(y),
+            "x_burn_per_day_raw": str(round(x)),
+            "x_burn_per_day": fmt_fraction(x, dec),
+            "y_burn_raw": str(round(y)),
+            "y_burn": fmt_fraction(y, dec),
             "assumption": assumption,
-            "data_source": "moralis+sqlite-cache",
+            "data_source": self.data_source,
             "today_last_updated_epoch": today_updated_epoch,
             "tokenomics": tokenomics,
             "tokenomics_projected": tokenomics_projected,
@@ -299,32 +657,162 @@ class BurnService:
         self.db.upsert_kv(cache_key, payload, now)
         return payload
 
-    async def token_metrics(self) -> Dict:
-        key = "token_metrics"
+    async def milestones(
+        self,
+        window_days: int,
+        pct_targets: List[Decimal],
+        token_targets: List[Decimal],
+        models: List[str],
+    ) -> Dict:
+        """
+        "Quando X% do max supply (ou N tokens) estará queimado?" para cada alvo e modelo.
+        Os dois modelos projetam burn linear (burned_now + X * dias), então a data sai
+        em forma fechada: dias = ceil((alvo - burned_now) / X). Série e tokenomics
+        vêm do cache (mesmas chaves de /burn/series e /token/metrics).
+        """
+        today = utc_today()
+        (daily, _total_raw, start_day, end_day, today_updated_epoch), tokenomics = await asyncio.gather(
+            self.get_daily_series(window_days), self.token_metrics()
+        )
+        dec = (await self.get_meta()).decimals
+        max_supply = self._max_supply_raw(dec)
+        burned_now = int(tokenomics["burned_raw"])
+        max_days = (date.max - today).days
+
+        rates: Dict[str, Dict] = {}
+        for model in models:
+            x, used_model, assumption = self._burn_rate(daily, model)
+            rates[model] = {"model": used_model, "x": x, "assumption": assumption}
+
+        # alvos em raw (Fraction: % do max supply não precisa ser inteiro)
+        targets: List[Tuple[str, Fraction]] = [(f"{fmt_decimal(p)}%", max_supply * Fraction(p) / 100) for p in pct_targets]
+        targets += [(fmt_decimal(t), Fraction(t) * 10 ** dec) for t in token_targets]
+
+        out = []
+        for label, target in targets:
+            projections: Dict[str, Dict] = {}
+            for model, rate in rates.items():
+                x = rate["x"]
+                if target > max_supply:
+                    projections[model] = {"status": "exceeds_max_supply", "days": None, "date": None}
+                elif burned_now >= target:
+                    projections[model] = {"status": "reached", "days": 0, "date": today.isoformat()}
+                elif x <= 0:
+                    projections[model] = {"status": "unreachable", "days": None, "date": None}
+                else:
+                    days = math.ceil((target - burned_now) / x)
+                    if days > max_days:
+                        projections[model] = {"status": "beyond_calendar", "days": days, "date": None}
+                    else:
+                        projections[model] = {
+                            "status": "projected",
+                            "days": days,
+                            "date": (today + timedelta(days=days)).isoformat(),
+                        }
+            out.append(
+                {
+                    "target": label,
+                    "target_tokens": fmt_fraction(target, dec),
+                    "target_pct": fmt_fraction(target * 100 / max_supply),
+                    "projections": projections,
+                }
+            )
+
+        return {
+            "window_days": window_days,
+            "start_day": start_day,
+            "end_day": end_day,
+            "burned_tokens": tokenomics["burned_tokens"],
+            "burned_pct": tokenomics["burned_pct"],
+            "max_supply_tokens": tokenomics["max_supply_tokens"],
+            "models": {
+                model: {
+                    "model": rate["model"],
+                    "x_burn_per_day": fmt_fraction(rate["x"], dec),
+                    "assumption": rate["assumption"],
+                }
+                for model, rate in rates.items()
+            },
+            "milestones": out,
+            "data_source": self.data_source,
+            "today_last_updated_epoch": today_updated_epoch,
+        }
+
+    async def _cached_component(
+        self, key: str, ttl_seconds: int, fetch: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, int, bool]:
+        """
+        Um componente de token_metrics com cache/TTL próprios: (valor, updated_at, stale).
+        Com Moralis indisponível devolve o último valor conhecido (stale=True).
+        """
         now = int(time.time())
         row = self.db.get_kv(key)
-        if row and (now - row.updated_at) <= self.cache_ttl_seconds:
-            payload = json.loads(row.payload_json)
-            payload["last_updated_epoch"] = row.updated_at
-            return payload
+        if row and (now - row.updated_at) <= ttl_seconds:
+            return json.loads(row.payload_json)["value"], row.updated_at, False
+        try:
+            value = await self._shared(key, fetch)
+        except UpstreamUnavailable:
+            if not row:
+                raise
+            return json.loads(row.payload_json)["value"], row.updated_at, True
+        self.db.upsert_kv(key, {"value": value}, now)
+        return value, now, False
+
+    async def _fetch_burned_balance_raw(self) -> str:
+        burned_raw = await self.moralis.get_wallet_erc20_balance_raw(self.dead_address, self.token_address)
+        if burned_raw is None:
+            raise RuntimeError("Falha ao obter balance da dead wallet no Moralis.")
+        return str(burned_raw)
+
+    async def _fetch_price_usd(self) -> Optional[float]:
+        return await self.moralis.get_token_price_usd(self.token_address)
+
+    def _derived_tokenomics(self, burned_raw: int, decimals: int) -> Dict:
+        # Só depende do balance/decimals/max supply: recalcula apenas quando algum deles muda
+        key = "token_metrics:tokenomics"
+        inputs = [str(burned_raw), decimals, self.max_supply_tokens_str]
+        row = self.db.get_kv(key)
+        if row:
+            cached = json.loads(row.payload_json)
+            if cached.get("inputs") == inputs:
+                return cached["value"]
+
+        value = self._tokenomics_values(burned_raw, decimals)
+        self.db.upsert_kv(key, {"inputs": inputs, "value": value}, int(time.time()))
+        return value
+
+    def _tokenomics_values(self, burned_raw: int, decimals: int) -> Dict:
+        max_supply = self._max_supply_raw(decimals)
+        remaining = max(0, max_supply - burned_raw)
+        t_scale = 10 ** (decimals + T_DIGITS)
 
+        return {
+            "max_supply_tokens": fmt_raw(max_supply, decimals),
+            "max_supply_t": fmt_ratio(max_supply, t_scale),
+            "burned_raw": str(burned_raw),
+            "burned_tokens": fmt_raw(burned_raw, decimals),
+            "burned_t": fmt_ratio(burned_raw, t_scale),
+            "burned_pct": pct_raw(burned_raw, max_supply),
+            "remaining_tokens": fmt_raw(remaining, decimals),
+            "remaining_t": fmt_ratio(remaining, t_scale),
+        }
+
+    async def token_metrics(self) -> Dict:
+        """
+        Balance da dead wallet e preço têm cache e TTL independentes
+        (balance_cache_ttl_seconds / price_cache_ttl_seconds); no miss, os dois
+        são buscados em paralelo. A tokenomics derivada é recombinada na leitura.
+        """
         meta = await self.get_meta()
         max_supply_tokens = Decimal(self.max_supply_tokens_str or "0")
         if max_supply_tokens <= 0:
             raise RuntimeError("MAX_SUPPLY_TOKENS inválido ou não definido.")
 
-        burned_raw = await self.moralis.get_wallet_erc20_balance_raw(self.dead_address, self.token_address)
-        if burned_raw is None:
-            raise RuntimeError("Falha ao obter balance da dead wallet no Moralis.")
-
-        burned_tokens = raw_to_tokens(burned_raw, meta.decimals)
-        remaining_tokens = max_supply_tokens - burned_tokens
-        if remaining_tokens < 0:
-            remaining_tokens = Decimal(0)
+        (burned_raw, balance_updated, balance_stale), (price, price_updated, price_stale) = await asyncio.gather(
+            self._cached_component("token_metrics:balance", self.balance_cache_ttl_seconds, self._fetch_burned_balance_raw),
+            self._cached_component("token_metrics:price", self.price_cache_ttl_seconds, self._fetch_price_usd),
+        )
 
-        burned_pct = pct(burned_tokens, max_supply_tokens)
-
-        price = await self.moralis.get_token_price_usd(self.token_address)
         price_str = None
         if price is not None:
             price_str = f"{price:.18f}".rstrip("0").rstrip(".")
@@ -337,18 +825,108 @@ class BurnService:
                 "decimals": meta.decimals,
                 "dead_address": self.dead_address,
             },
-            "max_supply_tokens": fmt_decimal(max_supply_tokens),
-            "max_supply_t": fmt_decimal(tokens_to_T(max_supply_tokens)),
-            "burned_raw": str(burned_raw),
-            "burned_tokens": fmt_decimal(burned_tokens),
-            "burned_t": fmt_decimal(tokens_to_T(burned_tokens)),
-            "burned_pct": fmt_decimal(burned_pct),
-            "remaining_tokens": fmt_decimal(remaining_tokens),
-            "remaining_t": fmt_decimal(tokens_to_T(remaining_tokens)),
+            **self._derived_tokenomics(int(burned_raw), meta.decimals),
             "price_usd": price_str,
             "data_source": "moralis+sqlite-cache",
+            "last_updated_epoch": balance_updated,
+            "price_updated_epoch": price_updated,
         }
-
-        self.db.upsert_kv(key, payload, now)
-        payload["last_updated_epoch"] = now
+        if balance_stale or price_stale:
+            # Moralis indisponível: algum componente veio do último valor conhecido
+            payload["stale"] = True
         return payload
+
+    def _cached_burn_between(self, start_day: date, end_day: date) -> int:
+        """
+        Burn em cache em [start_day, end_day]: rollups mensais inteiros + linhas diárias
+        das bordas. Só lê o SQLite (sem ensure_day_cached nem upstream); dias ausentes
+        levantam MissingHistoricalCache.
+        """
+        p = period_start(start_day, "month")
+        rollups = {r.period: r for r in self.db.list_rollup_range("month", p.isoformat(), end_day.isoformat())}
+        total = 0
+        missing: List[str] = []
+        while p <= end_day:
+            p_end = period_end(p, "month")
+            lo, hi = max(p, start_day), min(p_end, end_day)
+            rollup = rollups.get(p.isoformat())
+            if lo == p and (hi == p_end or hi == utc_today()) and rollup and rollup.days == (hi - lo).days + 1:
+                total += int(rollup.burn_raw)
+            else:
+                rows = {r.day: int(r.burn_raw) for r in self.db.list_daily_range(lo.isoformat(), hi.isoformat())}
+                total += sum(rows.values())
+                d = lo
+                while d <= hi:
+                    if d.isoformat() not in rows:
+                        missing.append(d.isoformat())
+                    d += timedelta(days=1)
+            p = p_end + timedelta(days=1)
+        if missing:
+            raise MissingHistoricalCache(missing)
+        return total
+
+    async def token_metrics_as_of(self, as_of: date) -> Dict:
+        """
+        Tokenomics no fim do dia `as_of` (UTC): balance atual da dead wallet menos
+        o burn em cache nos dias posteriores (até a linha de hoje como está no cache).
+        Nenhuma chamada ao Moralis além de token_metrics. O limite inferior de `as_of`
+        fica na rota (MAX_WINDOW_DAYS).
+        """
+        today = utc_today()
+        if as_of > today:
+            raise ValueError("as_of não pode estar no futuro.")
+
+        current = await self.token_metrics()
+        if as_of == today:
+            return {**current, "as_of": as_of.isoformat()}
+
+        burned_after = self._cached_burn_between(as_of + timedelta(days=1), today)
+        burned_raw = max(0, int(current["burned_raw"]) - burned_after)
+
+        meta = await self.get_meta()
+        return {
+            "token": current["token"],
+            **self._tokenomics_values(burned_raw, meta.decimals),
+            "as_of": as_of.isoformat(),
+            "price_usd": None,  # sem histórico de preço
+            "data_source": self.data_source,
+            "last_updated_epoch": current["last_updated_epoch"],
+        }
+
+    async def burned_series(self, window_days: int) -> Dict:
+        """
+        Burned/% do max supply no fim de cada dia da janela: cumulativo reverso
+        da série diária (em cache) a partir do balance atual.
+        """
+        (daily, _total_raw, start_day, end_day, today_updated_epoch), current = await asyncio.gather(
+            self.get_daily_series(window_days), self.token_metrics()
+        )
+        meta = await self.get_meta()
+        max_supply = self._max_supply_raw(meta.decimals)
+
+        points: List[Dict] = []
+        burned_raw = int(current["burned_raw"])
+        for d in reversed(daily):
+            b = max(0, burned_raw)
+            points.append(
+                {
+                    "day": d.day,
+                    "burned_raw": str(b),
+                    "burned_tokens": fmt_raw(b, meta.decimals),
+                    "burned_pct": pct_raw(b, max_supply),
+                }
+            )
+            # fim do dia anterior = fim deste dia menos o burn deste dia
+            burned_raw -= int(d.burn_raw)
+        points.reverse()
+
+        return {
+            "token": current["token"],
+            "window_days": window_days,
+            "start_day": start_day,
+            "end_day": end_day,
+            "max_supply_tokens": current["max_supply_tokens"],
+            "points": points,
+            "data_source": self.data_source,
+            "today_last_updated_epoch": today_updated_epoch,
+        }
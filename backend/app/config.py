@@ -25,6 +25,54 @@ class Settings(BaseModel):
     # Cache for /burn/series and /burn/projection results (reduces repeated frontend calls)
     series_cache_ttl_seconds: int = int(_env("SERIES_CACHE_TTL_SECONDS", _env("CACHE_TTL_SECONDS", "300")))
 
+    # token_metrics components are cached separately: dead-wallet balance and USD price
+    balance_cache_ttl_seconds: int = int(_env("BALANCE_CACHE_TTL_SECONDS", _env("CACHE_TTL_SECONDS", "300")))
+    price_cache_ttl_seconds: int = int(_env("PRICE_CACHE_TTL_SECONDS", _env("CACHE_TTL_SECONDS", "300")))
+
+    # Moralis retry policy (exponential backoff with jitter, bounded by a per-call deadline)
+    moralis_retry_max_attempts: int = int(_env("MORALIS_RETRY_MAX_ATTEMPTS", "5"))
+    moralis_retry_base_delay_seconds: float = float(_env("MORALIS_RETRY_BASE_DELAY_SECONDS", "0.5"))
+    moralis_retry_max_delay_seconds: float = float(_env("MORALIS_RETRY_MAX_DELAY_SECONDS", "10"))
+    moralis_retry_deadline_seconds: float = float(_env("MORALIS_RETRY_DEADLINE_SECONDS", "30"))
+
+    # Circuit breaker: after N failed calls, fail fast for RESET seconds (cached data is served instead)
+    moralis_circuit_failure_threshold: int = int(_env("MORALIS_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    moralis_circuit_reset_seconds: float = float(_env("MORALIS_CIRCUIT_RESET_SECONDS", "30"))
+
+    # Where daily burn transfers come from: "moralis" (default) or "rpc" (eth_getLogs on BSC_RPC_URL, no Moralis credits).
+    # Token metadata, price and dead-wallet balance always come from Moralis.
+    burn_data_source: str = _env("BURN_DATA_SOURCE", "moralis").lower()
+    bsc_rpc_url: str = _env("BSC_RPC_URL")
+    rpc_log_chunk_blocks: int = int(_env("RPC_LOG_CHUNK_BLOCKS", "5000"))
+    rpc_concurrency: int = int(_env("RPC_CONCURRENCY", "4"))
+
+    # Just after 00:00 UTC: finalize yesterday with one last scan, create today's row and pre-compute
+    # the ROLLOVER_PREWARM_KEYS series/projection keys most requested the previous day.
+    midnight_rollover: bool = _env_bool("MIDNIGHT_ROLLOVER", "true")
+    rollover_delay_seconds: int = int(_env("ROLLOVER_DELAY_SECONDS", "10"))
+    rollover_prewarm_keys: int = int(_env("ROLLOVER_PREWARM_KEYS", "10"))
+
+    # Extra tokens tracked by the same process, served under /tokens/{chain}/{address}/...
+    # Format: "chain:address:max_supply_tokens[:decimals]", comma separated. TOKEN_ADDRESS stays the primary token (root endpoints).
+    tokens: str = _env("TOKENS")
+
+    # Shared by every token: one HTTP connection pool and one Moralis rate limit (0 = unlimited)
+    http_max_connections: int = int(_env("HTTP_MAX_CONNECTIONS", "20"))
+    moralis_rate_limit_per_second: float = float(_env("MORALIS_RATE_LIMIT_PER_SECOND", "0"))
+    moralis_rate_limit_burst: int = int(_env("MORALIS_RATE_LIMIT_BURST", "5"))
+
+    # Background refresh of today's row for every token, every N seconds (0 = off; rows refresh on request)
+    today_refresh_seconds: int = int(_env("TODAY_REFRESH_SECONDS", "0"))
+
+    # Admin endpoints (/admin/*) require the X-Admin-Token header. Empty = admin endpoints disabled.
+    admin_token: str = _env("ADMIN_TOKEN")
+
+    # Profiling: Server-Timing header (db/upstream/compute/encode) on every response.
+    # Without it, admins can opt in per request with "X-Profile: timing" or "X-Profile: sample" (+ X-Admin-Token).
+    profile_all_requests: bool = _env_bool("PROFILE_ALL_REQUESTS", "false")
+    profile_sample_interval_ms: float = float(_env("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    profile_max_stored: int = int(_env("PROFILE_MAX_STORED", "20"))
+
     max_window_days: int = int(_env("MAX_WINDOW_DAYS", "3650"))
     max_horizon_days: int = int(_env("MAX_HORIZON_DAYS", "3650"))
 
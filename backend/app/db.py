@@ -2,35 +2,63 @@ from __future__ import annotations
 
 import sqlite3
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from datetime import date
+from typing import Optional, List, Dict, Tuple
 import json
 import threading
 
+from .profiling import timed
+from .utils import period_start
+
 _LOCK = threading.Lock()
 
+# Granularidades materializadas em `token_burn_rollup` (mantidas a cada upsert_daily)
+ROLLUP_GRANULARITIES = ("week", "month")
+
 @dataclass
 class DailyBurnRow:
     day: str
     burn_raw: str
     updated_at: int
 
+@dataclass
+class RollupRow:
+    granularity: str
+    period: str        # primeiro dia do período (YYYY-MM-DD)
+    burn_raw: str
+    days: int          # quantos dias do período existem em cache
+    updated_at: int
+
 @dataclass
 class KVRow:
     key: str
     payload_json: str
     updated_at: int
 
+def token_scope(chain: str, token_address: str) -> str:
+    """Chave de escopo de um token no cache: "<chain>:<address em minúsculas>"."""
+    return f"{chain.lower()}:{token_address.lower()}"
+
 class CacheDB:
     """
+    Um arquivo SQLite pode guardar vários tokens: as linhas diárias e os rollups
+    ficam em `token_burn_daily` / `token_burn_rollup` com a coluna `scope`
+    (ver token_scope) e as chaves do KV são prefixadas pelo escopo.
+    Cada instância enxerga apenas o seu escopo; várias instâncias podem apontar
+    para o mesmo arquivo.
+
     Compat:
     - Alguns builds anteriores usavam tabela `burn_daily`.
     - Builds posteriores usaram `daily_burn`.
-    Este wrapper detecta automaticamente qual existe e usa a mesma,
-    evitando perda de cache/histórico ao atualizar o código.
+    Na primeira abertura com o schema por token, as linhas da tabela antiga
+    (qualquer das duas) são copiadas para `legacy_scope` (padrão: o próprio
+    escopo), evitando perda de cache/histórico ao atualizar o código. A tabela
+    antiga não é alterada.
     """
-    def __init__(self, path: str):
+    def __init__(self, path: str, scope: str = "", legacy_scope: Optional[str] = None):
         self.path = path
-        self._daily_table: str = "burn_daily"
+        self.scope = scope
+        self.legacy_scope = scope if legacy_scope is None else legacy_scope
         self._init()
 
     def _conn(self) -> sqlite3.Connection:
@@ -60,38 +88,130 @@ class CacheDB:
                     """
                 )
 
-                has_burn_daily = self._table_exists(conn, "burn_daily")
-                has_daily_burn = self._table_exists(conn, "daily_burn")
-
-                # Preferir burn_daily se existir, para compatibilidade com seu cache.sqlite3
-                if has_burn_daily:
-                    self._daily_table = "burn_daily"
-                elif has_daily_burn:
-                    self._daily_table = "daily_burn"
-                else:
-                    # default: criar burn_daily
-                    self._daily_table = "burn_daily"
-                    cur.execute(
-                        """
-                        CREATE TABLE IF NOT EXISTS burn_daily (
-                            day TEXT PRIMARY KEY,
-                            burn_raw TEXT NOT NULL,
-                            updated_at INTEGER NOT NULL
-                        );
-                        """
-                    )
+                has_scoped = self._table_exists(conn, "token_burn_daily")
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS token_burn_daily (
+                        scope TEXT NOT NULL,
+                        day TEXT NOT NULL,
+                        burn_raw TEXT NOT NULL,
+                        updated_at INTEGER NOT NULL,
+                        PRIMARY KEY (scope, day)
+                    );
+                    """
+                )
+                # Rollups semanais/mensais derivados da tabela diária
+                cur.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS token_burn_rollup (
+                        scope TEXT NOT NULL,
+                        granularity TEXT NOT NULL,
+                        period TEXT NOT NULL,
+                        burn_raw TEXT NOT NULL,
+                        days INTEGER NOT NULL,
+                        updated_at INTEGER NOT NULL,
+                        PRIMARY KEY (scope, granularity, period)
+                    );
+                    """
+                )
+
+                if not has_scoped:
+                    # Preferir burn_daily se existir, para compatibilidade com seu cache.sqlite3
+                    legacy = next((t for t in ("burn_daily", "daily_burn") if self._table_exists(conn, t)), None)
+                    if legacy:
+                        cur.execute(
+                            f"INSERT INTO token_burn_daily(scope, day, burn_raw, updated_at) "
+                            f"SELECT ?, day, burn_raw, updated_at FROM {legacy}",
+                            (self.legacy_scope,),
+                        )
+                        self._rebuild_rollups(conn, self.legacy_scope)
 
                 conn.commit()
             finally:
                 conn.close()
 
+    # ----- Rollups -----
+
+    def _rebuild_rollups(self, conn: sqlite3.Connection, scope: str) -> None:
+        cur = conn.cursor()
+        cur.execute("SELECT day, burn_raw, updated_at FROM token_burn_daily WHERE scope = ?", (scope,))
+        acc: Dict[Tuple[str, str], List[int]] = {}
+        for r in cur.fetchall():
+            d = date.fromisoformat(r["day"])
+            for g in ROLLUP_GRANULARITIES:
+                item = acc.setdefault((g, period_start(d, g).isoformat()), [0, 0, 0])
+                item[0] += int(r["burn_raw"])
+                item[1] += 1
+                item[2] = max(item[2], int(r["updated_at"]))
+        cur.execute("DELETE FROM token_burn_rollup WHERE scope = ?", (scope,))
+        cur.executemany(
+            "INSERT INTO token_burn_rollup(scope, granularity, period, burn_raw, days, updated_at) VALUES(?,?,?,?,?,?)",
+            [(scope, g, period, str(v[0]), v[1], v[2]) for (g, period), v in acc.items()],
+        )
+
+    def _apply_rollup_delta(self, conn: sqlite3.Connection, day: str, delta: int, new_day: bool, updated_at: int) -> None:
+        cur = conn.cursor()
+        d = date.fromisoformat(day)
+        for g in ROLLUP_GRANULARITIES:
+            period = period_start(d, g).isoformat()
+            cur.execute(
+                "SELECT burn_raw, days FROM token_burn_rollup WHERE scope = ? AND granularity = ? AND period = ?",
+                (self.scope, g, period),
+            )
+            row = cur.fetchone()
+            burn = (int(row["burn_raw"]) if row else 0) + delta
+            days = (int(row["days"]) if row else 0) + (1 if new_day else 0)
+            cur.execute(
+                "INSERT INTO token_burn_rollup(scope, granularity, period, burn_raw, days, updated_at) VALUES(?,?,?,?,?,?) "
+                "ON CONFLICT(scope, granularity, period) DO UPDATE SET burn_raw=excluded.burn_raw, days=excluded.days, "
+                "updated_at=excluded.updated_at",
+                (self.scope, g, period, str(burn), days, int(updated_at)),
+            )
+
+    @timed("db")
+    def rebuild_rollups(self) -> None:
+        with _LOCK:
+            conn = self._conn()
+            try:
+                self._rebuild_rollups(conn, self.scope)
+                conn.commit()
+            finally:
+                conn.close()
+
+    @timed("db")
+    def list_rollup_range(self, granularity: str, start_period: str, end_period: str) -> List[RollupRow]:
+        conn = self._conn()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT granularity, period, burn_raw, days, updated_at FROM token_burn_rollup "
+                "WHERE scope = ? AND granularity = ? AND period >= ? AND period <= ? ORDER BY period ASC",
+                (self.scope, granularity, start_period, end_period),
+            )
+            return [
+                RollupRow(
+                    granularity=r["granularity"],
+                    period=r["period"],
+                    burn_raw=r["burn_raw"],
+                    days=int(r["days"]),
+                    updated_at=int(r["updated_at"]),
+                )
+                for r in cur.fetchall()
+            ]
+        finally:
+            conn.close()
+
     # ----- Daily burn -----
 
+    @timed("db")
     def get_daily(self, day: str) -> Optional[DailyBurnRow]:
         conn = self._conn()
         try:
             cur = conn.cursor()
-            cur.execute(f"SELECT day, burn_raw, updated_at FROM {self._daily_table} WHERE day = ?", (day,))
+            cur.execute(
+                "SELECT day, burn_raw, updated_at FROM token_burn_daily WHERE scope = ? AND day = ?",
+                (self.scope, day),
+            )
             row = cur.fetchone()
             if not row:
                 return None
@@ -99,29 +219,63 @@ class CacheDB:
         finally:
             conn.close()
 
+    @timed("db")
     def upsert_daily(self, day: str, burn_raw: str, updated_at: int) -> None:
         with _LOCK:
             conn = self._conn()
             try:
                 cur = conn.cursor()
-                # SQLite UPSERT requires PK; day is PK in both schemas
+                cur.execute("SELECT burn_raw FROM token_burn_daily WHERE scope = ? AND day = ?", (self.scope, day))
+                prev = cur.fetchone()
                 cur.execute(
-                    f"INSERT INTO {self._daily_table}(day, burn_raw, updated_at) VALUES(?,?,?) "
-                    f"ON CONFLICT(day) DO UPDATE SET burn_raw=excluded.burn_raw, updated_at=excluded.updated_at",
-                    (day, burn_raw, int(updated_at)),
+                    "INSERT INTO token_burn_daily(scope, day, burn_raw, updated_at) VALUES(?,?,?,?) "
+                    "ON CONFLICT(scope, day) DO UPDATE SET burn_raw=excluded.burn_raw, updated_at=excluded.updated_at",
+                    (self.scope, day, burn_raw, int(updated_at)),
                 )
+                # Mesmo commit: rollups nunca divergem da tabela diária
+                delta = int(burn_raw) - (int(prev["burn_raw"]) if prev else 0)
+                self._apply_rollup_delta(conn, day, delta, prev is None, updated_at)
                 conn.commit()
             finally:
                 conn.close()
 
+    @timed("db")
+    def bulk_upsert_daily(self, rows: List[DailyBurnRow], overwrite: bool = False) -> int:
+        """
+        Carga em lote (uma transação). Sem `overwrite`, linhas já existentes são mantidas.
+        Os rollups são reconstruídos no mesmo commit. Retorna quantas linhas foram gravadas.
+        """
+        if overwrite:
+            sql = (
+                "INSERT INTO token_burn_daily(scope, day, burn_raw, updated_at) VALUES(?,?,?,?) "
+                "ON CONFLICT(scope, day) DO UPDATE SET burn_raw=excluded.burn_raw, updated_at=excluded.updated_at"
+            )
+        else:
+            sql = (
+                "INSERT INTO token_burn_daily(scope, day, burn_raw, updated_at) VALUES(?,?,?,?) "
+                "ON CONFLICT(scope, day) DO NOTHING"
+            )
+        with _LOCK:
+            conn = self._conn()
+            try:
+                before = conn.total_changes
+                conn.executemany(sql, [(self.scope, r.day, r.burn_raw, int(r.updated_at)) for r in rows])
+                written = conn.total_changes - before
+                self._rebuild_rollups(conn, self.scope)
+                conn.commit()
+                return written
+            finally:
+                conn.close()
+
+    @timed("db")
     def list_daily_range(self, start_day: str, end_day: str) -> List[DailyBurnRow]:
         conn = self._conn()
         try:
             cur = conn.cursor()
             cur.execute(
-                f"SELECT day, burn_raw, updated_at FROM {self._daily_table} "
-                f"WHERE day >= ? AND day <= ? ORDER BY day ASC",
-                (start_day, end_day),
+                "SELECT day, burn_raw, updated_at FROM token_burn_daily "
+                "WHERE scope = ? AND day >= ? AND day <= ? ORDER BY day ASC",
+                (self.scope, start_day, end_day),
             )
             rows = cur.fetchall()
             return [
@@ -133,18 +287,23 @@ class CacheDB:
 
     # ----- KV cache -----
 
+    def _kv_key(self, key: str) -> str:
+        return f"{self.scope}|{key}" if self.scope else key
+
+    @timed("db")
     def get_kv(self, key: str) -> Optional[KVRow]:
         conn = self._conn()
         try:
             cur = conn.cursor()
-            cur.execute("SELECT key, payload_json, updated_at FROM kv_cache WHERE key = ?", (key,))
+            cur.execute("SELECT key, payload_json, updated_at FROM kv_cache WHERE key = ?", (self._kv_key(key),))
             row = cur.fetchone()
             if not row:
                 return None
-            return KVRow(key=row["key"], payload_json=row["payload_json"], updated_at=int(row["updated_at"]))
+            return KVRow(key=key, payload_json=row["payload_json"], updated_at=int(row["updated_at"]))
         finally:
             conn.close()
 
+    @timed("db")
     def upsert_kv(self, key: str, payload: Dict, updated_at: int) -> None:
         payload_json = json.dumps(payload, ensure_ascii=False)
         with _LOCK:
@@ -154,8 +313,21 @@ class CacheDB:
                 cur.execute(
                     "INSERT INTO kv_cache(key, payload_json, updated_at) VALUES(?,?,?) "
                     "ON CONFLICT(key) DO UPDATE SET payload_json=excluded.payload_json, updated_at=excluded.updated_at",
-                    (key, payload_json, int(updated_at)),
+                    (self._kv_key(key), payload_json, int(updated_at)),
                 )
                 conn.commit()
             finally:
                 conn.close()
+
+    @timed("db")
+    def delete_kv_like(self, pattern: str) -> int:
+        """Remove as chaves do escopo que casam com `pattern` (SQL LIKE). Retorna quantas."""
+        with _LOCK:
+            conn = self._conn()
+            try:
+                cur = conn.cursor()
+                cur.execute("DELETE FROM kv_cache WHERE key LIKE ?", (self._kv_key(pattern),))
+                conn.commit()
+                return cur.rowcount
+            finally:
+                conn.close()
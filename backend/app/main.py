@@ -1,14 +1,24 @@
+import hmac
 import os
-from fastapi import FastAPI, HTTPException, Query
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Callable, List, Optional
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import Headers
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from .config import settings
-from .db import CacheDB
-from .moralis import MoralisClient
+from .registry import ServiceRegistry
+from .profiling import ProfileStore, ProfilingMiddleware, TimedJSONResponse
+from .resilience import UpstreamUnavailable
 from .burn_service import BurnService, MissingHistoricalCache
+from .snapshot import SnapshotError, export_snapshot, import_snapshot
+from .utils import utc_today
 
 
 def _require_env(value: str, name: str) -> str:
@@ -20,7 +30,22 @@ _require_env(settings.moralis_api_key, "MORALIS_API_KEY")
 _require_env(settings.token_address, "TOKEN_ADDRESS")
 _require_env(settings.max_supply_tokens, "MAX_SUPPLY_TOKENS")
 
-app = FastAPI(title="Jager Burn Projection API", version="2.2.0")
+registry = ServiceRegistry(settings)
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    registry.start()
+    try:
+        yield
+    finally:
+        await registry.aclose()
+
+app = FastAPI(
+    title="Jager Burn Projection API",
+    version="2.2.0",
+    lifespan=_lifespan,
+    default_response_class=TimedJSONResponse,
+)
 
 def _cors_list() -> list[str]:
     raw = os.getenv("CORS_ORIGINS", "http://localhost:3000")
@@ -34,83 +59,62 @@ app.add_middleware(
     allow_credentials=False,      # leave False unless you use cookies/credentials
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-Id"],
 )
 
-db = CacheDB(settings.cache_db_path)
-moralis = MoralisClient(api_key=settings.moralis_api_key, chain=settings.chain)
-
-svc = BurnService(
-    moralis=moralis,
-    db=db,
-    token_address=settings.token_address,
-    dead_address=settings.dead_address,
-    decimals_fallback=settings.token_decimals,
-    cache_ttl_seconds=settings.cache_ttl_seconds,
-    max_supply_tokens=settings.max_supply_tokens,
-    allow_fetch_missing_historical_days=settings.allow_fetch_missing_historical_days,
-    series_cache_ttl_seconds=settings.series_cache_ttl_seconds,
+profiles = ProfileStore(settings.profile_max_stored)
+
+def _is_admin(token: str) -> bool:
+    return bool(settings.admin_token) and hmac.compare_digest(token.encode(), settings.admin_token.encode())
+
+def _profile_mode(scope) -> str:
+    """
+    Opt-in: Server-Timing em todas as respostas (PROFILE_ALL_REQUESTS) ou por
+    requisição de admin (X-Profile: timing | sample). Com `sample`, a pilha do
+    event loop é amostrada durante a requisição e o perfil fica disponível em
+    /admin/profiles/{X-Profile-Id}.
+    """
+    headers = Headers(scope=scope)
+    mode = headers.get("x-profile", "").lower()
+    if mode and not _is_admin(headers.get("x-admin-token", "")):
+        mode = ""
+    if mode in ("timing", "sample"):
+        return mode
+    return "timing" if settings.profile_all_requests else ""
+
+app.add_middleware(
+    ProfilingMiddleware,
+    mode_for=_profile_mode,
+    store=profiles,
+    sample_interval_seconds=settings.profile_sample_interval_ms / 1000,
 )
 
 @app.get("/")
 async def root():
     return {"ok": True, "docs": "/docs", "health": "/health"}
 
+def _upstream_unavailable(e: UpstreamUnavailable) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail={"error": "UPSTREAM_UNAVAILABLE", "message": str(e), "circuit": registry.moralis_breaker.snapshot()},
+    )
+
 @app.get("/health")
 async def health():
-    return {"ok": True}
-
-@app.get("/token/meta")
-async def token_meta():
-    meta = await svc.get_meta()
     return {
-        "address": settings.token_address,
-        "name": meta.name,
-        "symbol": meta.symbol,
-        "decimals": meta.decimals,
-        "dead_address": settings.dead_address,
+        "ok": True,
+        "moralis_circuit": registry.moralis_breaker.snapshot(),
+        "tokens": len(registry.services()),
+        "jobs": registry.scheduler.snapshot(),
     }
 
-@app.get("/token/metrics")
-async def token_metrics():
-    try:
-        return await svc.token_metrics()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-@app.get("/burn/summary")
-async def burn_summary():
-    try:
-        return await svc.summary()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-@app.get("/burn/series")
-async def burn_series(window_days: int = Query(30, ge=1, le=settings.max_window_days)):
-    try:
-        daily, total_raw, start_day, end_day, today_updated_epoch = await svc.get_daily_series(window_days)
-        meta = await svc.get_meta()
-        from .utils import raw_to_tokens, fmt_decimal
-        total_tokens = raw_to_tokens(int(total_raw), meta.decimals)
+@app.get("/tokens")
+async def tokens():
+    return {"tokens": registry.tokens()}
 
-        return {
-            "token": {
-                "address": settings.token_address,
-                "name": meta.name,
-                "symbol": meta.symbol,
-                "decimals": meta.decimals,
-                "dead_address": settings.dead_address,
-            },
-            "window_days": window_days,
-            "start_day": start_day,
-            "end_day": end_day,
-            "total_burn_raw": str(int(total_raw)),
-            "total_burn": fmt_decimal(total_tokens),
-            "daily": [d.__dict__ for d in daily],
-            "data_source": "moralis+sqlite-cache",
-            "today_last_updated_epoch": today_updated_epoch,
-        }
-    except MissingHistoricalCache as e:
-        raise HTTPException(
+def _http_error(e: Exception) -> HTTPException:
+    if isinstance(e, MissingHistoricalCache):
+        return HTTPException(
             status_code=400,
             detail={
                 "error": "MISSING_HISTORICAL_CACHE",
@@ -119,26 +123,229 @@ async def burn_series(window_days: int = Query(30, ge=1, le=settings.max_window_
                               "Ou copie o cache.sqlite3 antigo para o caminho definido em CACHE_DB_PATH.",
             },
         )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-
-@app.get("/burn/projection")
-async def burn_projection(
-    window_days: int = Query(30, ge=1, le=settings.max_window_days),
-    horizon_days: int = Query(365, ge=1, le=settings.max_horizon_days),
-    model: str = Query("mean", pattern="^(mean|regression)$"),
-):
-    try:
-        return await svc.projection(window_days=window_days, horizon_days=horizon_days, model=model)
-    except MissingHistoricalCache as e:
+    if isinstance(e, UpstreamUnavailable):
+        return _upstream_unavailable(e)
+    return HTTPException(status_code=400, detail=str(e))
+
+def _require_admin(token: str) -> None:
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints desabilitados (ADMIN_TOKEN não definido).")
+    if not _is_admin(token):
+        raise HTTPException(status_code=401, detail="X-Admin-Token inválido.")
+
+@app.get("/admin/profiles")
+async def admin_profiles(x_admin_token: str = Header("")):
+    _require_admin(x_admin_token)
+    return {"profiles": profiles.list()}
+
+@app.get("/admin/profiles/{profile_id}")
+async def admin_profile(profile_id: str, x_admin_token: str = Header("")):
+    """Pilhas no formato collapsed (uma por linha, com contagem): flamegraph.pl ou speedscope."""
+    _require_admin(x_admin_token)
+    prof = profiles.get(profile_id)
+    if prof is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado (mantemos só os mais recentes).")
+    return PlainTextResponse(
+        prof.collapsed(),
+        headers={
+            "Content-Disposition": f'attachment; filename="profile-{prof.id}.folded"',
+            "Server-Timing": prof.server_timing,
+        },
+    )
+
+# limites dos alvos em tokens de /burn/milestones (uint256 tem 78 dígitos)
+_MAX_TARGET_DIGITS = 80
+_MAX_TARGET_DECIMALS = 36
+
+def build_router(get_svc: Callable[..., BurnService]) -> APIRouter:
+    """
+    Endpoints de um token. Montado duas vezes: na raiz (token principal,
+    TOKEN_ADDRESS) e em /tokens/{chain}/{token_address} (qualquer token do registry).
+    """
+    router = APIRouter()
+
+    @router.get("/token/meta")
+    async def token_meta(svc: BurnService = Depends(get_svc)):
+        meta = await svc.get_meta()
+        return {
+            "address": svc.token_address,
+            "chain": svc.chain,
+            "name": meta.name,
+            "symbol": meta.symbol,
+            "decimals": meta.decimals,
+            "dead_address": svc.dead_address,
+        }
+
+    @router.get("/token/metrics")
+    async def token_metrics(
+        as_of: Optional[date] = Query(None, description="YYYY-MM-DD: tokenomics no fim desse dia (UTC)"),
+        svc: BurnService = Depends(get_svc),
+    ):
+        if as_of is not None:
+            # só histórico em cache: nada de varrer séculos de dias no event loop
+            today = utc_today()
+            if as_of > today:
+                raise HTTPException(status_code=422, detail="as_of não pode estar no futuro.")
+            if as_of < today - timedelta(days=settings.max_window_days):
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"as_of deve estar nos últimos {settings.max_window_days} dias.",
+                )
+        try:
+            if as_of is not None:
+                return await svc.token_metrics_as_of(as_of)
+            return await svc.token_metrics()
+        except Exception as e:
+            raise _http_error(e)
+
+    @router.get("/token/burned_series")
+    async def token_burned_series(
+        window_days: int = Query(30, ge=1, le=settings.max_window_days),
+        svc: BurnService = Depends(get_svc),
+    ):
+        try:
+            return await svc.burned_series(window_days)
+        except Exception as e:
+            raise _http_error(e)
+
+    @router.get("/burn/summary")
+    async def burn_summary(svc: BurnService = Depends(get_svc)):
+        try:
+            return await svc.summary()
+        except Exception as e:
+            raise _http_error(e)
+
+    @router.get("/burn/series")
+    async def burn_series(
+        window_days: int = Query(30, ge=1, le=settings.max_window_days),
+        granularity: str = Query("day", pattern="^(day|week|month)$"),
+        svc: BurnService = Depends(get_svc),
+    ):
+        try:
+            return await svc.series(window_days, granularity)
+        except Exception as e:
+            raise _http_error(e)
+
+    @router.get("/burn/projection")
+    async def burn_projection(
+        window_days: int = Query(30, ge=1, le=settings.max_window_days),
+        horizon_days: int = Query(365, ge=1, le=settings.max_horizon_days),
+        model: str = Query("mean", pattern="^(mean|regression)$"),
+        svc: BurnService = Depends(get_svc),
+    ):
+        try:
+            return await svc.projection(window_days=window_days, horizon_days=horizon_days, model=model)
+        except Exception as e:
+            raise _http_error(e)
+
+    @router.get("/burn/milestones")
+    async def burn_milestones(
+        pct: List[float] = Query([], description="Alvos em % do max supply (repita o parâmetro)"),
+        tokens: List[str] = Query([], description="Alvos em quantidade de tokens (repita o parâmetro)"),
+        window_days: int = Query(30, ge=1, le=settings.max_window_days),
+        model: List[str] = Query(["mean", "regression"]),
+        svc: BurnService = Depends(get_svc),
+    ):
+        if not pct and not tokens:
+            raise HTTPException(status_code=422, detail="Informe ao menos um alvo (pct=... ou tokens=...).")
+        if len(pct) + len(tokens) > 50:
+            raise HTTPException(status_code=422, detail="Máximo de 50 alvos por chamada.")
+        if any(m not in ("mean", "regression") for m in model):
+            raise HTTPException(status_code=422, detail="model deve ser mean ou regression.")
+        if any(not (0 < p <= 100) for p in pct):
+            raise HTTPException(status_code=422, detail="pct deve estar em (0, 100].")
+        try:
+            token_targets = [Decimal(t) for t in tokens]
+        except InvalidOperation:
+            raise HTTPException(status_code=422, detail="tokens deve conter números decimais.")
+        if any(not t.is_finite() or t <= 0 for t in token_targets):
+            raise HTTPException(status_code=422, detail="tokens deve ser > 0.")
+        # antes de qualquer Fraction/fmt_decimal: "1e100000000" ou "1e-100000000"
+        # viram inteiros gigantes e travam o event loop
+        if any(
+            len(t.as_tuple().digits) > _MAX_TARGET_DIGITS
+            or t.adjusted() >= _MAX_TARGET_DIGITS
+            or t.as_tuple().exponent < -_MAX_TARGET_DECIMALS
+            for t in token_targets
+        ):
+            raise HTTPException(
+                status_code=422,
+                detail=f"tokens aceita no máximo {_MAX_TARGET_DIGITS} dígitos e {_MAX_TARGET_DECIMALS} casas decimais.",
+            )
+        try:
+            return await svc.milestones(
+                window_days=window_days,
+                pct_targets=[Decimal(str(p)) for p in pct],
+                token_targets=token_targets,
+                models=list(dict.fromkeys(model)),
+            )
+        except Exception as e:
+            raise _http_error(e)
+
+    @router.get("/dashboard")
+    async def dashboard(
+        window_days: int = Query(30, ge=1, le=settings.max_window_days),
+        horizon_days: int = Query(365, ge=1, le=settings.max_horizon_days),
+        model: str = Query("mean", pattern="^(mean|regression)$"),
+        chart_window_days: int = Query(30, ge=1, le=settings.max_window_days),
+        granularity: str = Query("day", pattern="^(day|week|month)$"),
+        projection: bool = Query(True, description="false omite a seção projection"),
+        svc: BurnService = Depends(get_svc),
+    ):
+        """
+        /token/metrics + /burn/summary + /burn/projection + /burn/series numa resposta.
+        Uma seção com erro vem como {"error": <mesmo detail do endpoint individual>}.
+        """
+        sections = await svc.dashboard(window_days, horizon_days, model, chart_window_days, granularity, projection)
+        out = {}
+        for name, value in sections.items():
+            if isinstance(value, Exception):
+                out[name] = {"error": _http_error(value).detail}
+            elif isinstance(value, BaseException):
+                raise value
+            else:
+                out[name] = value
+        return out
+
+    @router.get("/admin/snapshot")
+    async def admin_snapshot_export(
+        x_admin_token: str = Header(""),
+        svc: BurnService = Depends(get_svc),
+    ):
+        _require_admin(x_admin_token)
+        data = export_snapshot(svc.db, svc.chain, svc.token_address)
+        return Response(
+            content=data,
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="jager-burn-snapshot.json.gz"'},
+        )
+
+    @router.post("/admin/snapshot")
+    async def admin_snapshot_import(
+        request: Request,
+        overwrite: bool = Query(False),
+        x_admin_token: str = Header(""),
+        svc: BurnService = Depends(get_svc),
+    ):
+        _require_admin(x_admin_token)
+        try:
+            return import_snapshot(svc.db, await request.body(), svc.chain, svc.token_address, overwrite=overwrite)
+        except SnapshotError as e:
+            raise HTTPException(status_code=400, detail={"error": "INVALID_SNAPSHOT", "message": str(e)})
+
+    return router
+
+def _primary_svc() -> BurnService:
+    return registry.primary
+
+def _path_svc(chain: str, token_address: str) -> BurnService:
+    svc = registry.get(chain, token_address)
+    if svc is None:
         raise HTTPException(
-            status_code=400,
-            detail={
-                "error": "MISSING_HISTORICAL_CACHE",
-                "missing_days": e.missing_days,
-                "how_to_fix": "Execute o backfill uma vez para preencher o histórico (ex.: python -m app.backfill --start 2025-04-28). "
-                              "Ou copie o cache.sqlite3 antigo para o caminho definido em CACHE_DB_PATH.",
-            },
+            status_code=404,
+            detail={"error": "UNKNOWN_TOKEN", "message": f"Token não configurado: {chain}:{token_address}"},
         )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    return svc
+
+app.include_router(build_router(_primary_svc))
+app.include_router(build_router(_path_svc), prefix="/tokens/{chain}/{token_address}")
@@ -1,47 +1,114 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
 from typing import Any, Dict, Optional, Set, Tuple, AsyncIterator, List
 import asyncio
+import logging
 import httpx
 
+from .resilience import CircuitBreaker, RateLimiter, RetryPolicy, send_with_retry
+
 MORALIS_BASE = "https://deep-index.moralis.io/api/v2.2"
 
+# Maior `limit` aceito pelo endpoint /:address/erc20/transfers
+MORALIS_MAX_PAGE_LIMIT = 100
+
+logger = logging.getLogger(__name__)
+
 @dataclass
 class TokenMeta:
     name: str
     symbol: str
     decimals: int
 
+@dataclass
+class _WindowScan:
+    items: List[Dict[str, Any]]
+    truncated: bool
+    oldest: Optional[datetime]
+    pages: int
+
+class BurnScanTruncated(RuntimeError):
+    """A varredura atingiu o limite de páginas e a janela não pode mais ser dividida."""
+    def __init__(self, from_date_iso: str, to_date_iso: str, pages: int):
+        super().__init__(
+            f"Moralis transfers truncated: {pages} pages in [{from_date_iso}, {to_date_iso}] without exhausting the cursor"
+        )
+        self.from_date_iso = from_date_iso
+        self.to_date_iso = to_date_iso
+        self.pages = pages
+
+def _parse_iso(s: Optional[str]) -> Optional[datetime]:
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(s).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+def _first_present(item: Dict[str, Any], *keys: str) -> Any:
+    for k in keys:
+        v = item.get(k)
+        if v is not None:
+            return v
+    return None
+
+def _to_iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
 class MoralisClient:
-    def __init__(self, api_key: str, chain: str = "bsc", timeout: float = 30.0):
+    source_name = "moralis"
+
+    def __init__(
+        self,
+        api_key: str,
+        chain: str = "bsc",
+        timeout: float = 30.0,
+        retry_policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        http: Optional[httpx.AsyncClient] = None,
+    ):
         if not api_key:
             raise RuntimeError("MORALIS_API_KEY não definido.")
         self.api_key = api_key
         self.chain = chain
         self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker("moralis")
+        self.rate_limiter = rate_limiter
+        # Pool HTTP compartilhado (opcional): sem ele, cada chamada abre o seu cliente
+        self.http = http
 
     def _headers(self) -> Dict[str, str]:
         return {"X-API-Key": self.api_key}
 
-    async def _get(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
-        # Basic retry/backoff for 429 and transient 5xx
-        max_attempts = 5
-        backoff = 0.75
-        async with httpx.AsyncClient(timeout=self.timeout, headers=self._headers()) as client:
-            for attempt in range(1, max_attempts + 1):
-                r = await client.get(url, params=params)
-                if r.status_code == 429:
-                    retry_after = r.headers.get("Retry-After")
-                    wait_s = float(retry_after) if retry_after and retry_after.replace(".", "", 1).isdigit() else backoff * attempt
-                    await asyncio.sleep(min(wait_s, 10.0))
-                    continue
-                if 500 <= r.status_code < 600:
-                    await asyncio.sleep(min(backoff * attempt, 5.0))
-                    continue
-                r.raise_for_status()
-                return r.json()
-        raise httpx.HTTPStatusError("Too many requests / retry attempts exceeded", request=None, response=None)
+    @asynccontextmanager
+    async def _client(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self.http is not None:
+            yield self.http
+            return
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            yield client
+
+    async def _request(self, client: httpx.AsyncClient, url: str, params: Dict[str, Any]) -> Any:
+        # Retry/backoff, circuit breaker e rate limit compartilhados por todos os endpoints
+        r = await send_with_retry(
+            lambda: client.get(url, params=params, headers=self._headers(), timeout=self.timeout),
+            self.retry_policy,
+            self.breaker,
+            self.rate_limiter,
+        )
+        return r.json()
+
+    async def _get(self, url: str, params: Dict[str, Any]) -> Any:
+        async with self._client() as client:
+            return await self._request(client, url, params)
 
     async def get_token_metadata(self, token_address: str) -> Optional[TokenMeta]:
         url = f"{MORALIS_BASE}/erc20/metadata"
@@ -78,16 +145,112 @@ class MoralisClient:
         return None
 
     def _transfer_id(self, item: Dict[str, Any]) -> Optional[Tuple[str, str]]:
-        tx = item.get("transaction_hash") or item.get("transactionHash")
-        log_index = item.get("log_index") or item.get("logIndex")
+        tx = _first_present(item, "transaction_hash", "transactionHash")
+        # log_index 0 é válido: não usar `or` aqui
+        log_index = _first_present(item, "log_index", "logIndex")
         if tx is not None and log_index is not None:
             return (str(tx), str(log_index))
-        bn = item.get("block_number") or item.get("blockNumber")
-        ti = item.get("transaction_index") or item.get("transactionIndex")
+        bn = _first_present(item, "block_number", "blockNumber")
+        ti = _first_present(item, "transaction_index", "transactionIndex")
         if tx is not None and bn is not None and ti is not None:
             return (str(tx), f"{bn}:{ti}")
         return None
 
+
+    async def _scan_window(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        token_address: str,
+        from_date_iso: str,
+        to_date_iso: str,
+        page_limit: int,
+        max_pages: int,
+    ) -> _WindowScan:
+        """
+        Pagina uma janela [from, to] até o cursor acabar ou até `max_pages`.
+        Se o limite de páginas for atingido com cursor ainda presente, a janela
+        é marcada como truncada e `oldest` indica até onde a varredura chegou
+        (Moralis retorna do mais recente para o mais antigo).
+        """
+        cursor: Optional[str] = None
+        prev_cursor: Optional[str] = None
+        pages = 0
+        items: List[Dict[str, Any]] = []
+        oldest: Optional[datetime] = None
+
+        while True:
+            params: Dict[str, Any] = {
+                "chain": self.chain,
+                "from_date": from_date_iso,
+                "to_date": to_date_iso,
+                "limit": page_limit,
+                # Moralis aceita contract_addresses[] para filtrar apenas esse token
+                "contract_addresses": [token_address],
+            }
+            if cursor:
+                params["cursor"] = cursor
+
+            payload = await self._request(client, url, params)
+            result = payload.get("result", []) or []
+            for item in result:
+                ts = _parse_iso(item.get("block_timestamp") or item.get("blockTimestamp"))
+                if ts is not None and (oldest is None or ts < oldest):
+                    oldest = ts
+                items.append(item)
+
+            prev_cursor = cursor
+            cursor = payload.get("cursor")
+            pages += 1
+
+            if not cursor:
+                break
+            if prev_cursor is not None and cursor == prev_cursor:
+                break
+            if pages >= max_pages:
+                return _WindowScan(items=items, truncated=True, oldest=oldest, pages=pages)
+
+        return _WindowScan(items=items, truncated=False, oldest=oldest, pages=pages)
+
+    async def _scan_range(
+        self,
+        client: httpx.AsyncClient,
+        sem: asyncio.Semaphore,
+        url: str,
+        token_address: str,
+        from_date_iso: str,
+        to_date_iso: str,
+        page_limit: int,
+        max_pages: int,
+        min_split_seconds: int,
+    ) -> List[Dict[str, Any]]:
+        async with sem:
+            scan = await self._scan_window(client, url, token_address, from_date_iso, to_date_iso, page_limit, max_pages)
+        if not scan.truncated:
+            return scan.items
+
+        # Janela truncada: o que já veio cobre [oldest, to]. O restante [from, oldest]
+        # é dividido ao meio e as metades são varridas em paralelo (recursivamente).
+        start = _parse_iso(from_date_iso)
+        end = _parse_iso(to_date_iso)
+        if start is None or end is None:
+            raise BurnScanTruncated(from_date_iso, to_date_iso, scan.pages)
+        if scan.oldest is not None and start < scan.oldest < end:
+            end = scan.oldest
+        if (end - start).total_seconds() <= min_split_seconds:
+            raise BurnScanTruncated(from_date_iso, to_date_iso, scan.pages)
+
+        mid = start + (end - start) / 2
+        logger.warning(
+            "Moralis transfers truncated after %d pages in [%s, %s]; splitting [%s, %s] at %s",
+            scan.pages, from_date_iso, to_date_iso, _to_iso(start), _to_iso(end), _to_iso(mid),
+        )
+        halves = await asyncio.gather(
+            self._scan_range(client, sem, url, token_address, _to_iso(start), _to_iso(mid), page_limit, max_pages, min_split_seconds),
+            self._scan_range(client, sem, url, token_address, _to_iso(mid), _to_iso(end), page_limit, max_pages, min_split_seconds),
+        )
+        return scan.items + halves[0] + halves[1]
+
     async def iter_burn_transfers(
         self,
         token_address: str,
@@ -95,8 +258,10 @@ class MoralisClient:
         dead_address: str | None = None,
         from_date_iso: str = "",
         to_date_iso: str = "",
-        page_limit: int = 100,
+        page_limit: int = MORALIS_MAX_PAGE_LIMIT,
         max_pages: int = 200,
+        split_concurrency: int = 4,
+        min_split_seconds: int = 60,
     ) -> AsyncIterator[Dict[str, Any]]:
         """
         Retorna TRANSFERS para a carteira dead usando o endpoint **por wallet**:
@@ -115,8 +280,16 @@ class MoralisClient:
         - contract_addresses=[token_address]
         - depois filtramos apenas itens com to_address == dead (incoming).
 
+        Paginação adaptativa:
+        - `page_limit` é limitado ao máximo aceito pela API (MORALIS_MAX_PAGE_LIMIT).
+        - se `max_pages` for atingido com cursor pendente, o intervalo restante é
+          dividido ao meio e as metades são varridas em paralelo (até
+          `split_concurrency` janelas simultâneas).
+        - se não der para dividir mais (janela <= `min_split_seconds`), levanta
+          BurnScanTruncated em vez de devolver uma soma incompleta.
+
         Proteções:
-        - dedupe por (tx_hash, log_index) quando disponível
+        - dedupe por (tx_hash, log_index) quando disponível (inclusive entre janelas)
         - break se cursor não avançar
         """
         target_address = (to_address or dead_address)
@@ -124,66 +297,26 @@ class MoralisClient:
             raise ValueError("to_address/dead_address é obrigatório.")
 
         url = f"{MORALIS_BASE}/{target_address}/erc20/transfers"
-        cursor: Optional[str] = None
-        prev_cursor: Optional[str] = None
-        pages = 0
+        page_limit = max(1, min(int(page_limit), MORALIS_MAX_PAGE_LIMIT))
         seen: Set[Tuple[str, str]] = set()
-
         dead_lc = target_address.lower()
+        sem = asyncio.Semaphore(max(1, split_concurrency))
+
+        async with self._client() as client:
+            items = await self._scan_range(
+                client, sem, url, token_address, from_date_iso, to_date_iso, page_limit, max_pages, min_split_seconds,
+            )
+
+        for item in items:
+            # Apenas incoming para dead
+            to_addr = (item.get("to_address") or "").lower()
+            if to_addr != dead_lc:
+                continue
+
+            tid = self._transfer_id(item)
+            if tid:
+                if tid in seen:
+                    continue
+                seen.add(tid)
 
-        async with httpx.AsyncClient(timeout=self.timeout, headers=self._headers()) as client:
-            while True:
-                params: Dict[str, Any] = {
-                    "chain": self.chain,
-                    "from_date": from_date_iso,
-                    "to_date": to_date_iso,
-                    "limit": page_limit,
-                    # Moralis aceita contract_addresses[] para filtrar apenas esse token
-                    "contract_addresses": [token_address],
-                }
-                if cursor:
-                    params["cursor"] = cursor
-
-                payload: Optional[Dict[str, Any]] = None
-                for attempt in range(1, 6):
-                    r = await client.get(url, params=params)
-                    if r.status_code == 429:
-                        retry_after = r.headers.get("Retry-After")
-                        wait_s = float(retry_after) if retry_after and retry_after.isdigit() else 0.75 * attempt
-                        await asyncio.sleep(min(wait_s, 10.0))
-                        continue
-                    if 500 <= r.status_code < 600:
-                        await asyncio.sleep(min(0.5 * attempt, 5.0))
-                        continue
-                    r.raise_for_status()
-                    payload = r.json()
-                    break
-
-                if payload is None:
-                    raise httpx.HTTPStatusError("429 Too Many Requests (retries exceeded)", request=None, response=None)
-
-                result = payload.get("result", []) or []
-                for item in result:
-                    # Apenas incoming para dead
-                    to_addr = (item.get("to_address") or "").lower()
-                    if to_addr != dead_lc:
-                        continue
-
-                    tid = self._transfer_id(item)
-                    if tid:
-                        if tid in seen:
-                            continue
-                        seen.add(tid)
-
-                    yield item
-
-                prev_cursor = cursor
-                cursor = payload.get("cursor")
-                pages += 1
-
-                if not cursor:
-                    break
-                if prev_cursor is not None and cursor == prev_cursor:
-                    break
-                if pages >= max_pages:
-                    break
+            yield item
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+import os
+import sys
+import threading
+import time
+import uuid
+
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+@dataclass
+class _Frame:
+    name: str
+    children: List[Tuple[float, float]] = field(default_factory=list)
+
+    def child_seconds(self) -> float:
+        # união dos intervalos: fases filhas concorrentes (gather) não são descontadas em dobro
+        total, end = 0.0, float("-inf")
+        for a, b in sorted(self.children):
+            if b <= end:
+                continue
+            total += b - max(a, end)
+            end = b
+        return total
+
+@dataclass
+class RequestTimings:
+    """
+    Tempo por fase de uma requisição. Cada fase conta só o tempo exclusivo
+    (fases aninhadas são descontadas da fase externa); o que não cai em nenhuma
+    fase fica na fase raiz `compute`. Fases concorrentes somam os seus tempos,
+    então `upstream` pode passar do total.
+    """
+    seconds: Dict[str, float] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + max(0.0, seconds)
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def server_timing(self, total_seconds: float) -> str:
+        parts = []
+        for name in ("db", "upstream", "compute", "encode"):
+            if name in self.seconds:
+                parts.append(f'{name};dur={self.seconds[name] * 1000:.1f};desc="{self.calls[name]} calls"')
+        for name in sorted(set(self.seconds) - {"db", "upstream", "compute", "encode"}):
+            parts.append(f"{name};dur={self.seconds[name] * 1000:.1f}")
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[Tuple[RequestTimings, _Frame]]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Mede o bloco como fase `name` da requisição atual (no-op fora de uma requisição perfilada)."""
+    cur = _current.get()
+    if cur is None:
+        yield
+        return
+    timings, parent = cur
+    frame = _Frame(name)
+    token = _current.set((timings, frame))
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        t1 = time.perf_counter()
+        _current.reset(token)
+        timings.add(name, (t1 - t0) - frame.child_seconds())
+        parent.children.append((t0, t1))
+
+def timed(name: str) -> Callable[[F], F]:
+    """Decorator (síncrono): a chamada inteira conta como fase `name`."""
+    def deco(fn: F) -> F:
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return deco
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI puro: sem perfil pedido (`mode_for` devolve ""), repassa direto
+    para o app, sem custo extra por requisição. Com "timing" adiciona Server-Timing;
+    com "sample" também amostra a pilha do event loop e guarda o perfil em `store`
+    (id no header X-Profile-Id).
+
+    As fases valem até o início da resposta; a fase raiz é `compute`.
+    """
+    def __init__(
+        self,
+        app: Any,
+        mode_for: Callable[[Dict[str, Any]], str],
+        store: "ProfileStore",
+        sample_interval_seconds: float = 0.005,
+    ):
+        self.app = app
+        self.mode_for = mode_for
+        self.store = store
+        self.sample_interval_seconds = sample_interval_seconds
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        mode = self.mode_for(scope) if scope["type"] == "http" else ""
+        if not mode:
+            await self.app(scope, receive, send)
+            return
+
+        sampler = None
+        if mode == "sample":
+            sampler = StackSampler(threading.get_ident(), self.sample_interval_seconds)
+            sampler.start()
+        timings = RequestTimings()
+        root = _Frame("compute")
+        token = _current.set((timings, root))
+        t0 = time.perf_counter()
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            nonlocal sampler
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - t0
+                timings.add("compute", elapsed - root.child_seconds())
+                header = timings.server_timing(elapsed)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", header)
+                if sampler is not None:
+                    samples, sampler = sampler.stop(), None
+                    prof = self.store.add(scope["method"], scope["path"], elapsed * 1000, header, samples)
+                    headers.append("X-Profile-Id", prof.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            if sampler is not None:
+                sampler.stop()
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse cuja serialização conta como fase `encode`."""
+    def render(self, content: Any) -> bytes:
+        with phase("encode"):
+            return super().render(content)
+
+class StackSampler:
+    """
+    Profiler por amostragem: uma thread lê a pilha da thread do event loop a
+    cada `interval_seconds` (sys._current_frames) e conta pilhas no formato
+    "collapsed" (flamegraph.pl / speedscope).
+
+    Amostra a thread inteira: requisições concorrentes no mesmo loop aparecem
+    no mesmo perfil.
+    """
+    def __init__(self, thread_id: int, interval_seconds: float = 0.005):
+        self.thread_id = thread_id
+        self.interval_seconds = max(0.001, interval_seconds)
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+@dataclass
+class StoredProfile:
+    id: str
+    method: str
+    path: str
+    created_at: int
+    duration_ms: float
+    server_timing: str
+    samples: Counter
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "created_at": self.created_at,
+            "duration_ms": round(self.duration_ms, 1),
+            "server_timing": self.server_timing,
+            "samples": sum(self.samples.values()),
+        }
+
+class ProfileStore:
+    """Últimos `max_items` perfis em memória (não persiste entre restarts)."""
+    def __init__(self, max_items: int = 20):
+        self.max_items = max(1, max_items)
+        self._items: "OrderedDict[str, StoredProfile]" = OrderedDict()
+
+    def add(self, method: str, path: str, duration_ms: float, server_timing: str, samples: Counter) -> StoredProfile:
+        prof = StoredProfile(
+            id=uuid.uuid4().hex,
+            method=method,
+            path=path,
+            created_at=int(time.time()),
+            duration_ms=duration_ms,
+            server_timing=server_timing,
+            samples=samples,
+        )
+        self._items[prof.id] = prof
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return prof
+
+    def get(self, profile_id: str) -> Optional[StoredProfile]:
+        return self._items.get(profile_id)
+
+    def list(self) -> List[Dict]:
+        return [p.summary() for p in reversed(self._items.values())]
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import logging
+import httpx
+
+from .config import Settings
+from .db import CacheDB, token_scope
+from .moralis import MoralisClient
+from .bsc_rpc import BscRpcClient
+from .resilience import CircuitBreaker, RateLimiter, RetryPolicy
+from .burn_service import BurnService
+from .scheduler import Scheduler
+from .utils import utc_today
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TokenConfig:
+    chain: str
+    token_address: str
+    max_supply_tokens: str
+    decimals: int = 18
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return (self.chain.lower(), self.token_address.lower())
+
+    @property
+    def scope(self) -> str:
+        return token_scope(self.chain, self.token_address)
+
+def parse_tokens(raw: str, decimals_fallback: int = 18) -> List[TokenConfig]:
+    """
+    TOKENS="bsc:0xabc...:1000000,eth:0xdef...:21000000:9"
+    (chain:address:max_supply_tokens[:decimals], separados por vírgula)
+    """
+    out: List[TokenConfig] = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = [p.strip() for p in item.split(":")]
+        if len(parts) not in (3, 4) or not all(parts):
+            raise ValueError(f"Token inválido em TOKENS: {item!r} (esperado chain:address:max_supply[:decimals])")
+        out.append(
+            TokenConfig(
+                chain=parts[0].lower(),
+                token_address=parts[1],
+                max_supply_tokens=parts[2],
+                decimals=int(parts[3]) if len(parts) == 4 else decimals_fallback,
+            )
+        )
+    return out
+
+class ServiceRegistry:
+    """
+    Um BurnService por (chain, token), todos compartilhando:
+    - um pool HTTP (httpx.AsyncClient) e um rate limiter/circuit breaker do Moralis;
+    - um MoralisClient (e um BscRpcClient, se configurado) por chain;
+    - o mesmo arquivo SQLite, com escopo por token (ver CacheDB);
+    - um único Scheduler para os jobs periódicos.
+    Acompanhar mais um token custa um BurnService e as suas linhas no cache.
+    """
+    def __init__(self, settings: Settings, allow_fetch_missing_historical_days: Optional[bool] = None):
+        self.settings = settings
+        self.allow_fetch_missing_historical_days = (
+            settings.allow_fetch_missing_historical_days
+            if allow_fetch_missing_historical_days is None
+            else allow_fetch_missing_historical_days
+        )
+        self.http = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_connections,
+            ),
+        )
+        self.rate_limiter = RateLimiter(settings.moralis_rate_limit_per_second, settings.moralis_rate_limit_burst)
+        self.moralis_breaker = CircuitBreaker(
+            "moralis",
+            failure_threshold=settings.moralis_circuit_failure_threshold,
+            reset_timeout=settings.moralis_circuit_reset_seconds,
+        )
+        self.scheduler = Scheduler()
+        self._moralis: Dict[str, MoralisClient] = {}
+        self._rpc: Dict[str, BscRpcClient] = {}
+        self._services: Dict[Tuple[str, str], BurnService] = {}
+
+        self.primary_config = TokenConfig(
+            chain=settings.chain,
+            token_address=settings.token_address,
+            max_supply_tokens=settings.max_supply_tokens,
+            decimals=settings.token_decimals,
+        )
+        self.primary = self.add(self.primary_config)
+        for cfg in parse_tokens(settings.tokens, settings.token_decimals):
+            if cfg.key not in self._services:
+                self.add(cfg)
+
+        self.scheduler.every(settings.today_refresh_seconds, "refresh_today", self.refresh_today)
+        if settings.midnight_rollover:
+            self.scheduler.daily_at(settings.rollover_delay_seconds, "midnight_rollover", self.rollover)
+
+    def _moralis_for(self, chain: str) -> MoralisClient:
+        if chain not in self._moralis:
+            s = self.settings
+            self._moralis[chain] = MoralisClient(
+                api_key=s.moralis_api_key,
+                chain=chain,
+                retry_policy=RetryPolicy(
+                    max_attempts=s.moralis_retry_max_attempts,
+                    base_delay=s.moralis_retry_base_delay_seconds,
+                    max_delay=s.moralis_retry_max_delay_seconds,
+                    deadline_seconds=s.moralis_retry_deadline_seconds,
+                ),
+                # mesma API key => mesma cota e mesmo breaker para todas as chains
+                breaker=self.moralis_breaker,
+                rate_limiter=self.rate_limiter,
+                http=self.http,
+            )
+        return self._moralis[chain]
+
+    def _transfer_source_for(self, chain: str) -> Optional[BscRpcClient]:
+        s = self.settings
+        if s.burn_data_source != "rpc":
+            return None
+        if chain != "bsc":
+            logger.warning("BURN_DATA_SOURCE=rpc only covers bsc; using Moralis transfers for %s", chain)
+            return None
+        if chain not in self._rpc:
+            self._rpc[chain] = BscRpcClient(
+                rpc_url=s.bsc_rpc_url,
+                chunk_blocks=s.rpc_log_chunk_blocks,
+                concurrency=s.rpc_concurrency,
+                http=self.http,
+            )
+        return self._rpc[chain]
+
+    def add(self, cfg: TokenConfig) -> BurnService:
+        s = self.settings
+        svc = BurnService(
+            moralis=self._moralis_for(cfg.chain),
+            db=CacheDB(s.cache_db_path, cfg.scope, legacy_scope=self.primary_config.scope),
+            token_address=cfg.token_address,
+            dead_address=s.dead_address,
+            decimals_fallback=cfg.decimals,
+            cache_ttl_seconds=s.cache_ttl_seconds,
+            max_supply_tokens=cfg.max_supply_tokens,
+            allow_fetch_missing_historical_days=self.allow_fetch_missing_historical_days,
+            series_cache_ttl_seconds=s.series_cache_ttl_seconds,
+            transfer_source=self._transfer_source_for(cfg.chain),
+            balance_cache_ttl_seconds=s.balance_cache_ttl_seconds,
+            price_cache_ttl_seconds=s.price_cache_ttl_seconds,
+            chain=cfg.chain,
+            track_demand=s.midnight_rollover,
+        )
+        self._services[cfg.key] = svc
+        return svc
+
+    def get(self, chain: str, token_address: str) -> Optional[BurnService]:
+        return self._services.get((chain.lower(), token_address.lower()))
+
+    def services(self) -> List[BurnService]:
+        return list(self._services.values())
+
+    def tokens(self) -> List[Dict]:
+        return [
+            {
+                "chain": svc.chain,
+                "address": svc.token_address,
+                "primary": svc is self.primary,
+                "path": f"/tokens/{svc.chain}/{svc.token_address}",
+            }
+            for svc in self._services.values()
+        ]
+
+    async def refresh_today(self) -> None:
+        """Job: atualiza a linha de hoje de cada token, um de cada vez (respeita o rate limit)."""
+        today = utc_today()
+        for svc in self.services():
+            try:
+                await svc.ensure_day_cached(today)
+            except Exception:
+                logger.exception("Today refresh failed for %s:%s", svc.chain, svc.token_address)
+
+    async def rollover(self) -> None:
+        """Job: virada do dia UTC de cada token (ver BurnService.rollover)."""
+        for svc in self.services():
+            try:
+                result = await svc.rollover(self.settings.rollover_prewarm_keys)
+            except Exception:
+                logger.exception("Rollover failed for %s:%s", svc.chain, svc.token_address)
+                continue
+            logger.info(
+                "Rollover %s:%s -> %s warmed=%d failed=%d invalidated=%d evicted=%d",
+                svc.chain, svc.token_address, result["day"], len(result["warmed"]), len(result["failed"]), result.get("invalidated", 0), result["evicted"],
+            )
+
+    def start(self) -> None:
+        self.scheduler.start()
+
+    async def aclose(self) -> None:
+        await self.scheduler.stop()
+        await self.http.aclose()
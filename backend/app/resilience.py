@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import random
+import time
+import httpx
+
+from .profiling import phase
+
+logger = logging.getLogger(__name__)
+
+class UpstreamUnavailable(RuntimeError):
+    """O upstream não respondeu dentro do orçamento de retries/deadline."""
+
+class CircuitOpenError(UpstreamUnavailable):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+@dataclass
+class RetryPolicy:
+    """
+    Backoff exponencial com jitter ("full jitter"), respeitando Retry-After,
+    limitado por número de tentativas e por um deadline total da chamada.
+    """
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    deadline_seconds: float = 30.0
+
+    def backoff(self, attempt: int) -> float:
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def retry_after(self, response: httpx.Response) -> Optional[float]:
+        raw = (response.headers.get("Retry-After") or "").strip()
+        if not raw:
+            return None
+        try:
+            return max(0.0, float(raw))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(raw)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+    def is_retryable(self, status_code: int) -> bool:
+        return status_code == 429 or 500 <= status_code < 600
+
+class CircuitBreaker:
+    """
+    closed -> open após `failure_threshold` chamadas falhas consecutivas.
+    open -> half_open depois de `reset_timeout` segundos; uma única chamada de
+    teste é liberada: sucesso fecha o circuito, falha reabre.
+    """
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Levanta CircuitOpenError se aberto. Retorna True se a chamada é a sonda do half_open."""
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "open" or self._probe_in_flight:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - (self._opened_at or 0.0)))
+            raise CircuitOpenError(self.name, retry_in)
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("Circuit '%s' closed", self.name)
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        was_probe = self._probe_in_flight
+        self._probe_in_flight = False
+        if was_probe or self._failures >= self.failure_threshold:
+            if self._opened_at is None or was_probe:
+                logger.warning("Circuit '%s' opened after %d failures", self.name, self._failures)
+            self._opened_at = time.monotonic()
+
+    def release_probe(self) -> None:
+        self._probe_in_flight = False
+
+    def snapshot(self) -> Dict:
+        return {"name": self.name, "state": self.state, "consecutive_failures": self._failures}
+
+class RateLimiter:
+    """
+    Token bucket assíncrono: até `rate_per_second` chamadas por segundo, com
+    rajadas de até `burst`. Compartilhado por todos os clientes que usam a mesma
+    chave/cota do upstream. `rate_per_second <= 0` desliga o limite.
+    """
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+async def send_with_retry(
+    send: Callable[[], Awaitable[httpx.Response]],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker] = None,
+    limiter: Optional[RateLimiter] = None,
+) -> httpx.Response:
+    """
+    Executa `send` aplicando a política de retry, o circuit breaker e o rate
+    limiter (cada tentativa consome uma vaga).
+    - 429/5xx e erros de requisição (httpx.RequestError): retry com backoff (ou Retry-After).
+    - demais 4xx: sobem como httpx.HTTPStatusError (o upstream está saudável).
+    - orçamento esgotado: conta falha no breaker e levanta UpstreamUnavailable.
+    """
+    # tempo de rede + backoff conta como fase "upstream" (Server-Timing)
+    with phase("upstream"):
+        return await _send_with_retry(send, policy, breaker, limiter)
+
+async def _send_with_retry(
+    send: Callable[[], Awaitable[httpx.Response]],
+    policy: RetryPolicy,
+    breaker: Optional[CircuitBreaker],
+    limiter: Optional[RateLimiter],
+) -> httpx.Response:
+    is_probe = breaker.before_call() if breaker else False
+    max_attempts = 1 if is_probe else max(1, policy.max_attempts)
+    deadline = time.monotonic() + policy.deadline_seconds
+    last_error = ""
+    recorded = False
+
+    try:
+        for attempt in range(1, max_attempts + 1):
+            wait_s: Optional[float] = None
+            if limiter:
+                await limiter.acquire()
+            try:
+                r = await send()
+            except httpx.RequestError as e:
+                last_error = f"{type(e).__name__}: {e}"
+            else:
+                if not policy.is_retryable(r.status_code):
+                    if breaker:
+                        breaker.record_success()
+                    recorded = True
+                    r.raise_for_status()
+                    return r
+                last_error = f"HTTP {r.status_code}"
+                wait_s = policy.retry_after(r)
+
+            if attempt == max_attempts:
+                break
+            if wait_s is None:
+                wait_s = policy.backoff(attempt)
+            wait_s = min(wait_s, policy.max_delay)
+            if time.monotonic() + wait_s > deadline:
+                break
+            await asyncio.sleep(wait_s)
+
+        if breaker:
+            breaker.record_failure()
+        recorded = True
+        raise UpstreamUnavailable(f"Upstream request failed after retries ({last_error})")
+    finally:
+        # cancelamento ou exceção fora do previsto (ex.: httpx.InvalidURL): a sonda
+        # do half_open não pode ficar presa, senão o circuito nunca mais fecha
+        if is_probe and breaker and not recorded:
+            breaker.release_probe()
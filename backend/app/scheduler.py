@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Job:
+    name: str
+    interval_seconds: float
+    fn: Callable[[], Awaitable[None]]
+    run_at_start: bool = False
+    at_utc_seconds: Optional[float] = None  # diário: segundos após 00:00 UTC
+    runs: int = 0
+    failures: int = 0
+    last_run_epoch: Optional[int] = None
+    last_error: Optional[str] = None
+
+class Scheduler:
+    """
+    Um único agendador de jobs periódicos para o processo (todos os tokens).
+    Cada job roda numa task própria; uma execução nunca se sobrepõe à anterior
+    do mesmo job e exceções são logadas sem derrubar o loop.
+    """
+    def __init__(self):
+        self._jobs: Dict[str, _Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def _add(self, job: _Job) -> None:
+        if job.name in self._jobs:
+            raise ValueError(f"Job já registrado: {job.name}")
+        self._jobs[job.name] = job
+
+    def every(self, seconds: float, name: str, fn: Callable[[], Awaitable[None]], run_at_start: bool = False) -> None:
+        if seconds <= 0:
+            return
+        self._add(_Job(name=name, interval_seconds=seconds, fn=fn, run_at_start=run_at_start))
+
+    def daily_at(self, seconds_after_midnight_utc: float, name: str, fn: Callable[[], Awaitable[None]]) -> None:
+        """Roda uma vez por dia, `seconds_after_midnight_utc` depois da virada do dia UTC."""
+        self._add(_Job(name=name, interval_seconds=86400, fn=fn, at_utc_seconds=max(0.0, seconds_after_midnight_utc)))
+
+    def _delay(self, job: _Job) -> float:
+        if job.at_utc_seconds is None:
+            return job.interval_seconds
+        now = datetime.now(timezone.utc)
+        at = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(seconds=job.at_utc_seconds)
+        while at <= now:
+            at += timedelta(days=1)
+        return (at - now).total_seconds()
+
+    async def _run(self, job: _Job) -> None:
+        if not job.run_at_start:
+            await asyncio.sleep(self._delay(job))
+        while True:
+            job.last_run_epoch = int(time.time())
+            try:
+                await job.fn()
+                job.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.failures += 1
+                job.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Scheduled job '%s' failed", job.name)
+            job.runs += 1
+            await asyncio.sleep(self._delay(job))
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._run(job)) for job in self._jobs.values()]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def snapshot(self) -> List[Dict]:
+        return [
+            {
+                "name": j.name,
+                "interval_seconds": j.interval_seconds,
+                "at_utc_seconds": j.at_utc_seconds,
+                "runs": j.runs,
+                "failures": j.failures,
+                "last_run_epoch": j.last_run_epoch,
+                "last_error": j.last_error,
+            }
+            for j in self._jobs.values()
+        ]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import json
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from .config import settings
+from .db import CacheDB, DailyBurnRow, token_scope
+from .utils import utc_today
+
+SNAPSHOT_FORMAT = "jager-burn-snapshot"
+SNAPSHOT_VERSION = 1
+
+class SnapshotError(ValueError):
+    pass
+
+def _checksum(daily: List[List[Any]]) -> str:
+    canonical = json.dumps(daily, separators=(",", ":"), ensure_ascii=True)
+    return hashlib.sha256(canonical.encode("ascii")).hexdigest()
+
+def export_snapshot(db: CacheDB, chain: str, token_address: str, through_day: Optional[date] = None) -> bytes:
+    """
+    Exporta o histórico imutável (dias < hoje UTC) como JSON gzip, versionado e
+    com checksum sha256 das linhas. Hoje fica de fora: ainda pode mudar.
+    """
+    last = through_day or (utc_today() - timedelta(days=1))
+    rows = db.list_daily_range("0000-01-01", last.isoformat())
+    daily = [[r.day, r.burn_raw, r.updated_at] for r in rows]
+    doc = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "chain": chain,
+        "token_address": token_address.lower(),
+        "created_at": int(time.time()),
+        "first_day": daily[0][0] if daily else None,
+        "last_day": daily[-1][0] if daily else None,
+        "rows": len(daily),
+        "sha256": _checksum(daily),
+        "daily": daily,
+    }
+    raw = json.dumps(doc, separators=(",", ":"), ensure_ascii=True).encode("ascii")
+    return gzip.compress(raw, mtime=0)
+
+def import_snapshot(
+    db: CacheDB,
+    data: bytes,
+    chain: str,
+    token_address: str,
+    overwrite: bool = False,
+) -> Dict[str, Any]:
+    """
+    Valida formato/versão/token/checksum e faz a carga em lote.
+    Por padrão mescla sem sobrescrever dias já presentes no cache.
+    """
+    try:
+        doc = json.loads(gzip.decompress(data))
+    except (OSError, EOFError, ValueError) as e:
+        raise SnapshotError(f"Snapshot ilegível: {e}")
+
+    if not isinstance(doc, dict) or doc.get("format") != SNAPSHOT_FORMAT:
+        raise SnapshotError("Arquivo não é um snapshot do jager-burn.")
+    if doc.get("version") != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Versão de snapshot não suportada: {doc.get('version')}")
+    if doc.get("chain") != chain or str(doc.get("token_address", "")).lower() != token_address.lower():
+        raise SnapshotError(
+            f"Snapshot é de {doc.get('chain')}:{doc.get('token_address')}, esperado {chain}:{token_address.lower()}"
+        )
+
+    daily = doc.get("daily") or []
+    if _checksum(daily) != doc.get("sha256") or len(daily) != doc.get("rows"):
+        raise SnapshotError("Checksum do snapshot não confere.")
+
+    rows: List[DailyBurnRow] = []
+    try:
+        for day_s, burn_raw, updated_at in daily:
+            rows.append(
+                DailyBurnRow(
+                    day=date.fromisoformat(day_s).isoformat(),
+                    burn_raw=str(int(burn_raw)),
+                    updated_at=int(updated_at),
+                )
+            )
+    except (TypeError, ValueError) as e:
+        raise SnapshotError(f"Linha inválida no snapshot: {e}")
+
+    written = db.bulk_upsert_daily(rows, overwrite=overwrite)
+    return {
+        "rows": len(rows),
+        "written": written,
+        "skipped": len(rows) - written,
+        "first_day": doc.get("first_day"),
+        "last_day": doc.get("last_day"),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Export/import do histórico diário (snapshot).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export")
+    ex.add_argument("--out", required=True, help="arquivo de saída (.json.gz)")
+    ex.add_argument("--through", default="", help="último dia incluído, YYYY-MM-DD (padrão: ontem UTC)")
+    im = sub.add_parser("import")
+    im.add_argument("--in", dest="src", required=True, help="arquivo de snapshot (.json.gz)")
+    im.add_argument("--overwrite", action="store_true", help="sobrescreve dias já presentes no cache")
+    for p in (ex, im):
+        p.add_argument("--chain", default=settings.chain, help="chain do token (padrão: %(default)s)")
+        p.add_argument("--token", default=settings.token_address, help="endereço do token (padrão: TOKEN_ADDRESS)")
+    args = ap.parse_args()
+
+    db = CacheDB(
+        settings.cache_db_path,
+        token_scope(args.chain, args.token),
+        legacy_scope=token_scope(settings.chain, settings.token_address),
+    )
+    if args.cmd == "export":
+        through = date.fromisoformat(args.through) if args.through else None
+        data = export_snapshot(db, args.chain, args.token, through)
+        with open(args.out, "wb") as f:
+            f.write(data)
+        print("exported", args.out, len(data), "bytes")
+    else:
+        with open(args.src, "rb") as f:
+            data = f.read()
+        print("imported", import_snapshot(db, data, args.chain, args.token, overwrite=args.overwrite))
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from datetime import datetime, timezone, timedelta, date
 from decimal import Decimal, getcontext
+from fractions import Fraction
+from functools import lru_cache
 
 getcontext().prec = 50
 
@@ -16,6 +18,25 @@ def day_start_end_iso(day: date) -> tuple[str, str]:
     end = start + timedelta(days=1)
     return start.isoformat().replace("+00:00", "Z"), end.isoformat().replace("+00:00", "Z")
 
+def period_start(day: date, granularity: str) -> date:
+    # week = ISO week (Monday start); month = calendar month
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "day":
+        return day
+    raise ValueError(f"granularity inválida: {granularity}")
+
+def period_end(day: date, granularity: str) -> date:
+    start = period_start(day, granularity)
+    if granularity == "week":
+        return start + timedelta(days=6)
+    if granularity == "month":
+        next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return next_month - timedelta(days=1)
+    return start
+
 def raw_to_tokens(raw: int, decimals: int) -> Decimal:
     return Decimal(raw) / (Decimal(10) ** Decimal(decimals))
 
@@ -32,6 +53,60 @@ def fmt_decimal(d: Decimal, max_decimals: int = 18) -> str:
         s = s.rstrip("0").rstrip(".")
     return s
 
+# ----- Aritmética inteira (unidades raw) -----
+# Os caminhos quentes ficam em inteiros/Fraction e só viram string na resposta.
+# As strings são as mesmas de fmt_decimal sobre Decimal com prec=50.
+
+@lru_cache(maxsize=8192)
+def fmt_raw(raw: int, decimals: int) -> str:
+    """raw -> tokens como string exata, sem zeros à direita (= fmt_decimal(raw_to_tokens(raw, decimals)))."""
+    sign = "-" if raw < 0 else ""
+    q, r = divmod(abs(raw), 10 ** decimals)
+    if not r:
+        return f"{sign}{q}"
+    return f"{sign}{q}." + str(r).rjust(decimals, "0").rstrip("0")
+
+def fmt_ratio(num: int, den: int, sig: int = 50) -> str:
+    """
+    num/den com até `sig` dígitos significativos (ROUND_HALF_EVEN, como a divisão
+    Decimal com prec=50), usando só inteiros. den == 0 -> "0".
+    """
+    if den == 0 or num == 0:
+        return "0"
+    if den < 0:
+        num, den = -num, -den
+    sign = "-" if num < 0 else ""
+    num = abs(num)
+
+    # escala 10**e para o quociente inteiro ter exatamente `sig` dígitos
+    e = sig - (len(str(num)) - len(str(den)))
+    while True:
+        n, d = (num * 10 ** e, den) if e >= 0 else (num, den * 10 ** -e)
+        q, r = divmod(n, d)
+        digits = len(str(q))
+        if digits < sig:
+            e += 1
+        elif digits > sig:
+            e -= 1
+        else:
+            break
+    if 2 * r > d or (2 * r == d and q % 2):
+        q += 1
+
+    if e <= 0:
+        return sign + str(q) + "0" * -e
+    s = str(q).rjust(e + 1, "0")
+    s = (s[:-e] + "." + s[-e:]).rstrip("0").rstrip(".")
+    return sign + s
+
+def fmt_fraction(x: Fraction, decimals: int = 0) -> str:
+    """Fraction em unidades raw -> tokens (decimals) como fmt_ratio."""
+    return fmt_ratio(x.numerator, x.denominator * 10 ** decimals)
+
+def pct_raw(part_raw: int, whole_raw: int) -> str:
+    """Percentual part/whole formatado, sem Decimal."""
+    return fmt_ratio(part_raw * 100, whole_raw)
+
 def pct(part: Decimal, whole: Decimal) -> Decimal:
     if whole == 0:
         return Decimal(0)
@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app.config lê o ambiente no import: configura antes de qualquer "from app ..."
+os.environ.setdefault("MORALIS_API_KEY", "test-key")
+os.environ.setdefault("TOKEN_ADDRESS", "0x74836cC0E821A6bE18e407E6388E430B689C66e9")
+os.environ.setdefault("MAX_SUPPLY_TOKENS", "14600000000000000")
+os.environ["CACHE_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="burn-tests-"), "cache.sqlite3")
+os.environ["MIDNIGHT_ROLLOVER"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.burn_service import BurnService  # noqa: E402
+from app.db import CacheDB  # noqa: E402
+from app.moralis import TokenMeta  # noqa: E402
+
+
+class FakeMoralis:
+    """Moralis em memória: burn por dia UTC (`burn_by_day["2026-01-30"] = raw`), balance e preço fixos."""
+    source_name = "moralis"
+
+    def __init__(self):
+        self.burn_by_day = {}
+
+    async def get_token_metadata(self, token_address):
+        return TokenMeta("T", "T", 18)
+
+    async def iter_burn_transfers(self, **kw):
+        yield {"value": str(self.burn_by_day.get(kw["from_date_iso"][:10], 0))}
+
+    async def get_wallet_erc20_balance_raw(self, wallet, token_address):
+        return 10**20
+
+    async def get_token_price_usd(self, token_address):
+        return 1.0
+
+
+@pytest.fixture
+def moralis():
+    return FakeMoralis()
+
+
+@pytest.fixture
+def service(tmp_path, moralis):
+    return BurnService(
+        moralis,
+        CacheDB(str(tmp_path / "cache.sqlite3"), "bsc:0xtok"),
+        "0xtok",
+        "0xdead",
+        18,
+        300,
+        "1000000",
+        allow_fetch_missing_historical_days=True,
+    )
@@ -0,0 +1,104 @@
+import asyncio
+import json
+from datetime import date, datetime, timezone
+
+import httpx
+
+from app.bsc_rpc import TRANSFER_TOPIC, BscRpcClient, _ChunkSize, _topic_address
+from app.resilience import RetryPolicy
+from app.utils import day_start_end_iso
+
+DEAD = "0x000000000000000000000000000000000000dEaD"
+DAY = date(2025, 1, 1)
+# bloco 0 dois dias antes de DAY, um bloco a cada 3s, 4 dias de chain
+T0 = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()) - 2 * 86400
+LATEST = 4 * 86400 // 3
+LOGS = [
+    {
+        "blockNumber": hex(b),
+        "logIndex": "0x0",
+        "transactionHash": f"0x{b:x}",
+        "data": hex(10**18),
+        "topics": [TRANSFER_TOPIC, "0x", _topic_address(DEAD)],
+    }
+    for b in range(0, LATEST, 997)
+]
+
+
+class Provider:
+    """Stand-in de um nó JSON-RPC: recusa ranges acima de `max_span` e responde rate limit nas primeiras `rate_limited` chamadas de eth_getLogs."""
+
+    def __init__(self, max_span: int = 10**9, rate_limited: int = 0):
+        self.max_span = max_span
+        self.rate_limited = rate_limited
+        self.spans = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        method, params = body["method"], body["params"]
+        if method == "eth_getBlockByNumber":
+            n = LATEST if params[0] == "latest" else int(params[0], 16)
+            return httpx.Response(200, json={"id": body["id"], "result": {"number": hex(n), "timestamp": hex(T0 + 3 * n)}})
+        lo, hi = int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16)
+        self.spans.append(hi - lo + 1)
+        if self.rate_limited:
+            self.rate_limited -= 1
+            return httpx.Response(200, json={"id": body["id"], "error": {"code": -32005, "message": "limit exceeded"}})
+        if hi - lo + 1 > self.max_span:
+            error = {"code": -32005, "message": "query returned more than 10000 results"}
+            return httpx.Response(200, json={"id": body["id"], "error": error})
+        logs = [l for l in LOGS if lo <= int(l["blockNumber"], 16) <= hi]
+        return httpx.Response(200, json={"id": body["id"], "result": logs})
+
+
+def _client(provider: Provider, chunk_blocks: int) -> BscRpcClient:
+    return BscRpcClient(
+        "http://rpc.test",
+        chunk_blocks=chunk_blocks,
+        concurrency=1,
+        retry_policy=RetryPolicy(base_delay=0.0, max_delay=0.0),
+        transport=httpx.MockTransport(provider),
+    )
+
+
+def _burns(client: BscRpcClient):
+    start, end = day_start_end_iso(DAY)
+
+    async def run():
+        return [t async for t in client.iter_burn_transfers("0xtok", to_address=DEAD, from_date_iso=start, to_date_iso=end)]
+
+    return asyncio.run(run())
+
+
+def _expected():
+    lo = (int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()) - T0 + 2) // 3
+    hi = lo + 86400 // 3
+    return sum(1 for l in LOGS if lo <= int(l["blockNumber"], 16) < hi)
+
+
+def test_range_limit_splits_without_shrinking_the_shared_chunk():
+    provider = Provider(max_span=6000)
+    client = _client(provider, chunk_blocks=10000)
+    assert len(_burns(client)) == _expected()
+    assert client.chunk_blocks == 10000
+
+    provider.spans.clear()
+    assert len(_burns(client)) == _expected()
+    assert provider.spans[0] == 10000  # a chamada seguinte começa do tamanho configurado
+
+
+def test_rate_limit_backs_off_instead_of_splitting():
+    provider = Provider(rate_limited=2)
+    client = _client(provider, chunk_blocks=10000)
+    assert len(_burns(client)) == _expected()
+    assert provider.spans[:3] == [10000, 10000, 10000]
+    assert min(provider.spans) == 86400 // 3 - 2 * 10000  # só o último trecho, mais curto
+
+
+def test_chunk_grows_back_after_successes():
+    chunk = _ChunkSize(1000, grow_after=2)
+    chunk.shrink(1000)
+    assert chunk.value == 500
+    chunk.success()
+    chunk.success()
+    assert chunk.value == 1000
@@ -0,0 +1,14 @@
+import asyncio
+
+
+def test_dashboard_without_projection(service):
+    out = asyncio.run(service.dashboard(30, 365, "mean", 7, include_projection=False))
+    assert set(out) == {"token_metrics", "summary", "series"}
+    assert out["series"]["window_days"] == 7
+    assert service.db.delete_kv_like("projection:%") == 0
+
+
+def test_dashboard_with_projection(service):
+    out = asyncio.run(service.dashboard(30, 365, "mean", 7))
+    assert out["projection"]["window_days"] == 30
+    assert out["series"]["window_days"] == 7
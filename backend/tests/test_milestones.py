@@ -0,0 +1,36 @@
+import asyncio
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import burn_service, main
+
+client = TestClient(main.app)
+
+
+@pytest.mark.parametrize("target", ["1e100000000", "1e-100000000"])
+def test_extreme_token_targets_are_rejected_fast(target):
+    t0 = time.perf_counter()
+    r = client.get("/burn/milestones", params={"tokens": target})
+    assert r.status_code == 422
+    assert time.perf_counter() - t0 < 1.0
+
+
+def test_token_target_above_max_supply_is_reported_per_target(service, moralis, monkeypatch):
+    # max supply do fixture: 1.000.000 tokens; um alvo acima dele não derruba os outros
+    monkeypatch.setattr(burn_service, "utc_today", lambda: date(2026, 1, 31))
+    moralis.burn_by_day["2026-01-30"] = 10**18
+    out = asyncio.run(
+        service.milestones(
+            window_days=2,
+            pct_targets=[],
+            token_targets=[Decimal("1e79"), Decimal("50")],
+            models=["mean"],
+        )
+    )
+    statuses = [m["projections"]["mean"]["status"] for m in out["milestones"]]
+    assert statuses[0] == "exceeds_max_supply"
+    assert statuses[1] == "reached"
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app import burn_service
+from app.moralis import BurnScanTruncated, MoralisClient
+
+DEAD = "0x000000000000000000000000000000000000dead"
+DAY_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DAY_END = DAY_START + timedelta(days=1)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def _transfers(timestamps):
+    return [
+        {
+            "transaction_hash": f"0x{i:x}",
+            "log_index": 0,  # log_index 0 é válido para o dedupe
+            "to_address": DEAD,
+            "value": str(i + 1),
+            "block_timestamp": _iso(ts),
+        }
+        for i, ts in enumerate(timestamps)
+    ]
+
+
+class Moralis:
+    """Stand-in do /:address/erc20/transfers: do mais recente ao mais antigo, [from_date, to_date] inclusivo, cursor = offset."""
+
+    def __init__(self, transfers):
+        self.transfers = sorted(transfers, key=lambda t: t["block_timestamp"], reverse=True)
+        self.requests = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        q = request.url.params
+        lo, hi = q["from_date"], q["to_date"]
+        window = [t for t in self.transfers if lo <= t["block_timestamp"] <= hi]
+        offset = int(q.get("cursor") or 0)
+        limit = int(q["limit"])
+        page = window[offset : offset + limit]
+        cursor = str(offset + limit) if offset + limit < len(window) else None
+        return httpx.Response(200, json={"result": page, "cursor": cursor})
+
+
+def _scan(provider: Moralis, **kw):
+    client = MoralisClient("key", http=httpx.AsyncClient(transport=httpx.MockTransport(provider)))
+
+    async def run():
+        return [
+            t
+            async for t in client.iter_burn_transfers(
+                "0xtok", to_address=DEAD, from_date_iso=_iso(DAY_START), to_date_iso=_iso(DAY_END), **kw
+            )
+        ]
+
+    return asyncio.run(run())
+
+
+def test_truncated_scan_splits_and_sums_each_transfer_once():
+    # 300 transfers no dia, 1 a cada 4 min, com pares no mesmo segundo (caem na borda das metades)
+    stamps = [DAY_START + timedelta(seconds=288 * (i // 2)) for i in range(300)]
+    transfers = _transfers(stamps)
+    provider = Moralis(transfers)
+
+    items = _scan(provider, page_limit=10, max_pages=3, min_split_seconds=60)
+
+    assert provider.requests > 30  # houve truncamento e divisão
+    assert len(items) == len(transfers)
+    assert sum(int(t["value"]) for t in items) == sum(int(t["value"]) for t in transfers)
+
+
+def test_unsplittable_window_raises():
+    # 50 transfers no mesmo segundo: nenhuma divisão reduz a janela
+    provider = Moralis(_transfers([DAY_START + timedelta(hours=12)] * 50))
+    with pytest.raises(BurnScanTruncated):
+        _scan(provider, page_limit=10, max_pages=2, min_split_seconds=60)
+
+
+def test_truncated_today_refresh_serves_cached_row(service, moralis, monkeypatch):
+    today = date(2026, 1, 31)
+    monkeypatch.setattr(burn_service, "utc_today", lambda: today)
+    service.db.upsert_daily(today.isoformat(), "42", int(time.time()) - 3600)
+
+    async def truncated(**kw):
+        raise BurnScanTruncated(kw["from_date_iso"], kw["to_date_iso"], 200)
+        yield
+
+    moralis.iter_burn_transfers = truncated
+    assert asyncio.run(service.ensure_day_cached(today)) == 42
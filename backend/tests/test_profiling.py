@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+from app import main
+
+client = TestClient(main.app)
+
+
+def test_no_profiling_headers_by_default():
+    r = client.get("/")
+    assert r.status_code == 200
+    assert "server-timing" not in r.headers
+
+
+def test_non_admin_profile_header_is_ignored(monkeypatch):
+    monkeypatch.setattr(main.settings, "admin_token", "secret")
+    r = client.get("/", headers={"X-Profile": "timing", "X-Admin-Token": "wrong"})
+    assert "server-timing" not in r.headers
+
+
+def test_admin_sample_stores_profile(monkeypatch):
+    monkeypatch.setattr(main.settings, "admin_token", "secret")
+    r = client.get("/health", headers={"X-Profile": "sample", "X-Admin-Token": "secret"})
+    assert r.status_code == 200
+    assert "compute;dur=" in r.headers["server-timing"]
+    assert "total;dur=" in r.headers["server-timing"]
+    prof = client.get(f"/admin/profiles/{r.headers['x-profile-id']}", headers={"X-Admin-Token": "secret"})
+    assert prof.status_code == 200
@@ -0,0 +1,52 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.resilience import CircuitBreaker, RetryPolicy, UpstreamUnavailable, send_with_retry
+
+REQ = httpx.Request("GET", "https://upstream.test/")
+
+
+def _half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def _policy() -> RetryPolicy:
+    return RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0, deadline_seconds=5.0)
+
+
+def test_probe_released_on_unexpected_exception():
+    breaker = _half_open_breaker()
+
+    async def send():
+        raise httpx.InvalidURL("bad url")
+
+    with pytest.raises(httpx.InvalidURL):
+        asyncio.run(send_with_retry(send, _policy(), breaker))
+    assert breaker.before_call() is True  # a próxima chamada pode sondar de novo
+
+
+def test_request_error_counts_as_failure():
+    breaker = _half_open_breaker()
+
+    async def send():
+        raise httpx.DecodingError("bad gzip", request=REQ)
+
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(send_with_retry(send, _policy(), breaker))
+    assert breaker._probe_in_flight is False
+    assert breaker._opened_at is not None
+
+
+def test_probe_success_closes_circuit():
+    breaker = _half_open_breaker()
+
+    async def send():
+        return httpx.Response(200, request=REQ)
+
+    asyncio.run(send_with_retry(send, _policy(), breaker))
+    assert breaker.state == "closed"
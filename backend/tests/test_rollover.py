@@ -0,0 +1,40 @@
+import asyncio
+from datetime import date
+
+from app import burn_service
+
+
+def test_rollover_recomputes_keys_cached_before_the_final_refresh(service, moralis, monkeypatch):
+    today = {"d": date(2026, 1, 30)}
+    monkeypatch.setattr(burn_service, "utc_today", lambda: today["d"])
+    moralis.burn_by_day["2026-01-30"] = 100
+
+    async def run():
+        await service.get_daily_series(2)  # demanda de ontem: entra no prewarm
+        today["d"] = date(2026, 1, 31)
+        _daily, stale_total, *_ = await service.get_daily_series(2)  # 00:01, antes do job
+        assert stale_total == 100
+        moralis.burn_by_day["2026-01-30"] = 150  # burns do fim de ontem
+
+        result = await service.rollover(prewarm_keys=5)
+        assert result["warmed"] == ["series:2:day"]
+        _daily, total, *_ = await service.get_daily_series(2)
+        assert total == 150
+
+    asyncio.run(run())
+
+
+def test_demand_is_capped_per_day(service, monkeypatch):
+    monkeypatch.setattr(burn_service, "DEMAND_MAX_KEYS", 3)
+    for horizon in range(10):
+        service._record_demand("projection", 30, horizon, "mean")
+    service._record_demand("projection", 30, 0, "mean")
+    (counter,) = service._demand.values()
+    assert len(counter) == 3
+    assert counter[("projection", 30, 0, "mean")] == 2
+
+
+def test_demand_not_tracked_without_rollover(service):
+    service.track_demand = False
+    service._record_demand("series", 30, "day")
+    assert service._demand == {}
@@ -0,0 +1,46 @@
+import asyncio
+import time
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import burn_service, main
+from app.burn_service import MissingHistoricalCache
+from app.utils import utc_today
+
+client = TestClient(main.app)
+
+
+@pytest.mark.parametrize("as_of", ["0001-01-01", "1900-01-01", (utc_today() + timedelta(days=1)).isoformat()])
+def test_as_of_out_of_range_is_rejected_fast(as_of):
+    t0 = time.perf_counter()
+    r = client.get("/token/metrics", params={"as_of": as_of})
+    assert r.status_code == 422
+    assert time.perf_counter() - t0 < 1.0
+
+
+def test_as_of_only_reads_cached_days(service, moralis, monkeypatch):
+    monkeypatch.setattr(burn_service, "utc_today", lambda: date(2026, 1, 31))
+    for day, raw in (("2026-01-29", 5), ("2026-01-30", 7), ("2026-01-31", 11)):
+        service.db.upsert_daily(day, str(raw), 0)
+
+    out = asyncio.run(service.token_metrics_as_of(date(2026, 1, 29)))
+    assert out["as_of"] == "2026-01-29"
+    assert out["burned_raw"] == str(10**20 - 18)
+
+    async def no_scan(**kw):
+        raise AssertionError("as_of não deve varrer o upstream")
+        yield
+
+    moralis.iter_burn_transfers = no_scan
+    with pytest.raises(MissingHistoricalCache) as e:
+        asyncio.run(service.token_metrics_as_of(date(2026, 1, 26)))
+    assert e.value.missing_days == ["2026-01-27", "2026-01-28"]
+
+
+def test_as_of_today_echoes_as_of(service, monkeypatch):
+    monkeypatch.setattr(burn_service, "utc_today", lambda: date(2026, 1, 31))
+    out = asyncio.run(service.token_metrics_as_of(date(2026, 1, 31)))
+    assert out["as_of"] == "2026-01-31"
+    assert out["price_usd"] is not None
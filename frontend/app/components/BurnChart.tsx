@@ -1,23 +1,34 @@
 "use client";
 
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 import type { BurnSeriesResponse } from "@/app/lib/types";
 import { api } from "@/app/lib/api";
 import { formatCompactNumber } from "@/app/lib/format";
 import { ResponsiveContainer, BarChart, Bar, XAxis, YAxis, Tooltip, CartesianGrid } from "recharts";
 
-type Props = { windowDays: number };
+// initial — undefined: /dashboard still loading; null: it had no series for the chart
+type Props = { windowDays: number; initial?: BurnSeriesResponse | null };
 
-export function BurnChart({ windowDays }: Props) {
-  const [data, setData] = useState<BurnSeriesResponse | null>(null);
+// Long windows are fetched as weekly/monthly rollups instead of thousands of daily bars
+function granularityFor(windowDays: number): "day" | "week" | "month" {
+  if (windowDays > 730) return "month";
+  if (windowDays > 365) return "week";
+  return "day";
+}
+
+export function BurnChart({ windowDays, initial }: Props) {
+  const [data, setData] = useState<BurnSeriesResponse | null>(initial ?? null);
   const [loading, setLoading] = useState<boolean>(true);
+  const firstWindow = useRef<number>(windowDays);
+  const loadedWindow = useRef<number | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const granularity = granularityFor(windowDays);
 
   const load = async () => {
     setLoading(true);
     setError(null);
     try {
-      const d = (await api.series(windowDays)) as BurnSeriesResponse;
+      const d = (await api.series(windowDays, granularity)) as BurnSeriesResponse;
       setData(d);
     } catch (e: any) {
       setError(e?.message || String(e));
@@ -28,12 +39,30 @@ export function BurnChart({ windowDays }: Props) {
   };
 
   useEffect(() => {
+    // Only `initial` changed: this window is already shown (or loading)
+    if (loadedWindow.current === windowDays) return;
+    const first = loadedWindow.current === null;
+    // The first window comes with /dashboard; don't fetch it twice
+    if (first && initial === undefined && windowDays === firstWindow.current) return;
+    loadedWindow.current = windowDays;
+    if (first && initial && initial.window_days === windowDays) {
+      setData(initial);
+      setLoading(false);
+      return;
+    }
     load();
-  }, [windowDays]);
+  }, [windowDays, initial]);
 
   const chartData = useMemo(() => {
     if (!data) return [];
-    return data.daily.map((d) => ({
+    if (data.points) {
+      return data.points.map((p) => ({
+        day: granularity === "month" ? p.period.slice(0, 7) : p.start_day.slice(2),
+        burn: Number(p.burn),
+        burnFullDay: `${p.start_day} → ${p.end_day}`,
+      }));
+    }
+    return (data.daily ?? []).map((d) => ({
       day: d.day.slice(5),
       burn: Number(d.burn),
       burnFullDay: d.day,
@@ -44,7 +73,7 @@ export function BurnChart({ windowDays }: Props) {
     <section className="rounded-xl border border-zinc-800 bg-zinc-900/30 p-4">
       <div className="flex flex-col gap-3 md:flex-row md:items-end md:justify-between">
         <div>
-          <div className="text-lg font-semibold">Burn per day (UTC)</div>
+          <div className="text-lg font-semibold">Burn per {granularity} (UTC)</div>
           <div className="text-sm text-zinc-400">
             Window: last {windowDays} days{data ? ` • ${data.start_day} → ${data.end_day}` : ""}
           </div>
@@ -74,7 +103,8 @@ export function BurnChart({ windowDays }: Props) {
               formatter={(value: any) => [formatCompactNumber(Number(value)), "Burn"]}
               labelFormatter={(_label: any, payload: any) => {
                 const item = payload?.[0]?.payload;
-                return item?.burnFullDay ? `Day: ${item.burnFullDay}` : "Day";
+                const label = granularity === "day" ? "Day" : "Period";
+                return item?.burnFullDay ? `${label}: ${item.burnFullDay}` : label;
               }}
             />
             <Bar dataKey="burn" />
@@ -5,8 +5,11 @@ import type { BurnSummaryResponse } from "@/app/lib/types";
 import { api } from "@/app/lib/api";
 import { epochToUtcString, formatTokenAmount } from "@/app/lib/format";
 
-export function SummaryCards() {
-  const [data, setData] = useState<BurnSummaryResponse | null>(null);
+// undefined: /dashboard still loading; null: it had no data for this section
+type Props = { initial?: BurnSummaryResponse | null };
+
+export function SummaryCards({ initial }: Props) {
+  const [data, setData] = useState<BurnSummaryResponse | null>(initial ?? null);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(true);
 
@@ -24,7 +27,16 @@ export function SummaryCards() {
   };
 
   useEffect(() => {
-    load();
+    if (initial === undefined) return;
+    if (initial) {
+      setData((current) => current ?? initial);
+      setLoading(false);
+    } else {
+      load();
+    }
+  }, [initial]);
+
+  useEffect(() => {
     const id = setInterval(load, 5 * 60 * 1000);
     return () => clearInterval(id);
   }, []);
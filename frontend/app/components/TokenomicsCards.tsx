@@ -5,8 +5,11 @@ import type { TokenMetricsResponse } from "@/app/lib/types";
 import { api } from "@/app/lib/api";
 import { epochToUtcString, formatPercentString, formatT, formatDecimalString, formatUsdString } from "@/app/lib/format";
 
-export function TokenomicsCards() {
-  const [data, setData] = useState<TokenMetricsResponse | null>(null);
+// undefined: /dashboard still loading; null: it had no data for this section
+type Props = { initial?: TokenMetricsResponse | null };
+
+export function TokenomicsCards({ initial }: Props) {
+  const [data, setData] = useState<TokenMetricsResponse | null>(initial ?? null);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState<boolean>(true);
 
@@ -25,7 +28,16 @@ export function TokenomicsCards() {
   };
 
   useEffect(() => {
-    load();
+    if (initial === undefined) return;
+    if (initial) {
+      setData((current) => current ?? initial);
+      setLoading(false);
+    } else {
+      load();
+    }
+  }, [initial]);
+
+  useEffect(() => {
     const id = setInterval(load, 5 * 60 * 1000);
     return () => clearInterval(id);
   }, []);
@@ -17,8 +17,21 @@ async function fetchJson<T>(path: string, init?: RequestInit): Promise<T> {
 
 export const api = {
   summary: () => fetchJson("/burn/summary"),
-  series: (windowDays: number) => fetchJson(`/burn/series?window_days=${windowDays}`),
+  series: (windowDays: number, granularity: "day" | "week" | "month" = "day") =>
+    fetchJson(`/burn/series?window_days=${windowDays}&granularity=${granularity}`),
   projection: (windowDays: number, horizonDays: number, model: "mean" | "regression") =>
     fetchJson(`/burn/projection?window_days=${windowDays}&horizon_days=${horizonDays}&model=${model}`),
   tokenMetrics: () => fetchJson("/token/metrics"),
+  dashboard: (
+    windowDays: number,
+    horizonDays: number,
+    model: "mean" | "regression",
+    chartWindowDays: number,
+    granularity: "day" | "week" | "month" = "day",
+    projection: boolean = true
+  ) =>
+    fetchJson(
+      `/dashboard?window_days=${windowDays}&horizon_days=${horizonDays}&model=${model}` +
+        `&chart_window_days=${chartWindowDays}&granularity=${granularity}&projection=${projection}`
+    ),
 };
@@ -8,11 +8,15 @@ export type BurnSummaryResponse = {
 export type BurnSeriesResponse = {
   token: { address: string; name: string; symbol: string; decimals: number; dead_address: string };
   window_days: number;
+  granularity?: "day" | "week" | "month";
   start_day: string;
   end_day: string;
   total_burn_raw: string;
   total_burn: string;
-  daily: Array<{ day: string; burn_raw: string; burn: string }>;
+  // granularity=day
+  daily?: Array<{ day: string; burn_raw: string; burn: string }>;
+  // granularity=week|month
+  points?: Array<{ period: string; start_day: string; end_day: string; days: number; burn_raw: string; burn: string }>;
   data_source: string;
   today_last_updated_epoch?: number | null;
 };
@@ -32,6 +36,17 @@ export type TokenMetricsResponse = {
   last_updated_epoch: number;
 };
 
+// /dashboard: each section is the same payload as its own endpoint, or { error } if it failed
+export type DashboardSectionError = { error: unknown };
+
+export type DashboardResponse = {
+  token_metrics: TokenMetricsResponse | DashboardSectionError;
+  summary: BurnSummaryResponse | DashboardSectionError;
+  series: BurnSeriesResponse | DashboardSectionError;
+  // absent when requested with projection=false
+  projection?: BurnProjectionResponse | DashboardSectionError;
+};
+
 export type BurnProjectionResponse = {
   model: "mean" | "regression" | "regression_fallback_mean";
   window_days: number;
@@ -1,18 +1,45 @@
 "use client";
 
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import { TokenomicsCards } from "@/app/components/TokenomicsCards";
 import { SummaryCards } from "@/app/components/SummaryCards";
 import { ProjectionCalculator } from "@/app/components/ProjectionCalculator";
 import { BurnChart } from "@/app/components/BurnChart";
+import type { DashboardResponse, DashboardSectionError } from "@/app/lib/types";
+import { api } from "@/app/lib/api";
+
+// Defaults shared by the first /dashboard call and the chart's own control
+const INITIAL_WINDOW_DAYS = 30;
+const INITIAL_HORIZON_DAYS = 365;
+
+// undefined while /dashboard is in flight, null if it failed or the section has an error
+function section<T extends object>(
+  dashboard: DashboardResponse | null | undefined,
+  value: T | DashboardSectionError | undefined
+): T | null | undefined {
+  if (dashboard === undefined) return undefined;
+  if (!value || "error" in value) return null;
+  return value as T;
+}
 
 export default function Page() {
-  const [chartWindowDays, setChartWindowDays] = useState<number>(30);
+  const [chartWindowDays, setChartWindowDays] = useState<number>(INITIAL_WINDOW_DAYS);
+  const [dashboard, setDashboard] = useState<DashboardResponse | null | undefined>(undefined);
+
+  // One request fills every section; the page renders right away and each component
+  // picks up its part when it arrives (or fetches on its own if that part failed).
+  // The projection is left out: the calculator only runs on "Calculate".
+  useEffect(() => {
+    api
+      .dashboard(INITIAL_WINDOW_DAYS, INITIAL_HORIZON_DAYS, "mean", INITIAL_WINDOW_DAYS, "day", false)
+      .then((d) => setDashboard(d as DashboardResponse))
+      .catch(() => setDashboard(null));
+  }, []);
 
   return (
     <div className="space-y-6">
-      <TokenomicsCards />
-      <SummaryCards />
+      <TokenomicsCards initial={section(dashboard, dashboard?.token_metrics)} />
+      <SummaryCards initial={section(dashboard, dashboard?.summary)} />
       <ProjectionCalculator />
 
       <section className="rounded-xl border border-zinc-800 bg-zinc-900/30 p-4">
@@ -28,7 +55,7 @@ export default function Page() {
             onChange={(e) => setChartWindowDays(Number(e.target.value))}
             className="rounded-lg border border-zinc-700 bg-zinc-950 px-3 py-2 text-sm"
           >
-            {[7, 14, 30, 60, 90, 180, 365].map((d) => (
+            {[7, 14, 30, 60, 90, 180, 365, 730, 1825].map((d) => (
               <option key={d} value={d}>
                 Last {d} days
               </option>
@@ -37,7 +64,7 @@ export default function Page() {
         </div>
       </section>
 
-      <BurnChart windowDays={chartWindowDays} />
+      <BurnChart windowDays={chartWindowDays} initial={section(dashboard, dashboard?.series)} />
     </div>
   );
 }